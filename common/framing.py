@@ -6,6 +6,9 @@ Wire format:
 
 Constraints:
   - 0 < length <= 64 KiB
+
+Binary messages (e.g. upload chunks) are a JSON header frame immediately
+followed by one raw payload frame.
 """
 
 from __future__ import annotations
@@ -16,6 +19,11 @@ import socket
 import struct
 from typing import Any, Optional
 
+try:  # optional: faster JSON (bytes in/out, no str round-trip)
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 HDR = struct.Struct("!I")
 MAX_FRAME = 64 * 1024
@@ -25,25 +33,52 @@ class FramingError(Exception):
     pass
 
 
+def set_low_latency(sock: Optional[socket.socket]) -> None:
+    """Disable Nagle (and delayed ACKs on Linux) for small request/response traffic."""
+    if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if hasattr(socket, "TCP_QUICKACK"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    except OSError:
+        pass
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; orjson when installed, stdlib json otherwise."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # e.g. ints beyond 64 bits; stdlib copes
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
 # ---------------------------
 # asyncio StreamReader/Writer
 # ---------------------------
 async def send_frame(writer: asyncio.StreamWriter, payload: bytes) -> None:
     if not payload or len(payload) > MAX_FRAME:
         raise FramingError("bad frame size")
-    writer.write(HDR.pack(len(payload)))
-    writer.write(payload)
+    # One transport write per frame (a single sendmsg on 3.12+).
+    writer.writelines((HDR.pack(len(payload)), payload))
     await writer.drain()
 
 
 async def _read_exact(reader: asyncio.StreamReader, n: int) -> Optional[bytes]:
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = await reader.read(n - len(buf))
-        if not chunk:
-            return None
-        buf.extend(chunk)
-    return bytes(buf)
+    # readexactly() slices the frame straight out of the reader's buffer: one
+    # copy, instead of read() pieces gathered into a bytearray and copied again.
+    try:
+        return await reader.readexactly(n)
+    except asyncio.IncompleteReadError:
+        return None
 
 
 async def recv_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
@@ -57,14 +92,23 @@ async def recv_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
 
 
 async def send_json(writer: asyncio.StreamWriter, obj: dict) -> None:
-    await send_frame(writer, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+    await send_frame(writer, json_dumps(obj))
 
 
 async def recv_json(reader: asyncio.StreamReader) -> Optional[dict]:
     frame = await recv_frame(reader)
     if frame is None:
         return None
-    return json.loads(frame.decode("utf-8"))
+    return json_loads(frame)
+
+
+async def send_binary_frame(writer: asyncio.StreamWriter, header: dict, payload: bytes) -> None:
+    """Send a JSON header frame followed by a raw payload frame (no base64)."""
+    head = json_dumps(header)
+    if not payload or len(payload) > MAX_FRAME or len(head) > MAX_FRAME:
+        raise FramingError("bad frame size")
+    writer.writelines((HDR.pack(len(head)), head, HDR.pack(len(payload)), payload))
+    await writer.drain()
 
 
 # ---------------------------
@@ -73,8 +117,7 @@ async def recv_json(reader: asyncio.StreamReader) -> Optional[dict]:
 def send_frame_sync(sock: socket.socket, payload: bytes) -> None:
     if not payload or len(payload) > MAX_FRAME:
         raise FramingError("bad frame size")
-    sock.sendall(HDR.pack(len(payload)))
-    sock.sendall(payload)
+    sock.sendall(HDR.pack(len(payload)) + payload)
 
 
 def _recv_exact_sync(sock: socket.socket, n: int) -> Optional[bytes]:
@@ -98,14 +141,21 @@ def recv_frame_sync(sock: socket.socket) -> Optional[bytes]:
 
 
 def send_json_sync(sock: socket.socket, obj: dict) -> None:
-    send_frame_sync(sock, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+    send_frame_sync(sock, json_dumps(obj))
 
 
 def recv_json_sync(sock: socket.socket) -> Optional[dict]:
     frame = recv_frame_sync(sock)
     if frame is None:
         return None
-    return json.loads(frame.decode("utf-8"))
+    return json_loads(frame)
+
+
+def send_binary_frame_sync(sock: socket.socket, header: dict, payload: bytes) -> None:
+    head = json_dumps(header)
+    if not payload or len(payload) > MAX_FRAME or len(head) > MAX_FRAME:
+        raise FramingError("bad frame size")
+    sock.sendall(b"".join((HDR.pack(len(head)), head, HDR.pack(len(payload)), payload)))
 
 
 def safe_json_dumps(obj: Any) -> str:
@@ -80,17 +80,21 @@ def parse_manifest(obj: Dict[str, Any]) -> GameManifest:
     )
 
 
-def load_manifest_from_dir(game_dir: Path) -> Tuple[Optional[GameManifest], Optional[str], Optional[dict]]:
+def load_manifest_from_dir(game_dir: Path) -> Tuple[Optional[GameManifest], Optional[str], Optional[str]]:
     """
-    Returns: (manifest, error, raw_obj)
+    Returns: (manifest, error, raw_text)
+
+    raw_text is manifest.json exactly as stored, so callers can keep it
+    without re-serializing the parsed object.
     """
     try:
         manifest_path = game_dir / "manifest.json"
-        raw = json.loads(manifest_path.read_text(encoding="utf-8"))
+        text = manifest_path.read_text(encoding="utf-8")
+        raw = json.loads(text)
         if not isinstance(raw, dict):
             return None, "bad_manifest_json", None
         m = parse_manifest(raw)
-        return m, None, raw
+        return m, None, text
     except FileNotFoundError:
         return None, "missing_manifest", None
     except json.JSONDecodeError:
@@ -8,7 +8,7 @@ used by server and client code.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Literal, Optional, TypedDict
+from typing import List, Literal, Optional, TypedDict
 
 
 Role = Literal["developer", "player"]
@@ -31,6 +31,11 @@ class Event(TypedDict, total=False):
     data: dict
 
 
+class EventBatch(TypedDict, total=False):
+    type: Literal["events"]
+    items: List[Event]
+
+
 @dataclass(frozen=True)
 class ServerPorts:
     db: int = 10101
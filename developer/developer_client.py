@@ -11,7 +11,6 @@ Connects to Developer Server and supports:
 
 from __future__ import annotations
 
-import base64
 import hashlib
 import os
 import socket
@@ -22,7 +21,7 @@ from pathlib import Path
 from typing import Optional, Tuple
 
 from hw3.common.config import get_int, get_str, section
-from hw3.common.framing import recv_json_sync, send_json_sync, safe_json_dumps
+from hw3.common.framing import MAX_FRAME, recv_json_sync, send_binary_frame_sync, send_json_sync, safe_json_dumps
 from hw3.common.manifest import load_manifest_from_dir
 
 
@@ -30,7 +29,8 @@ _CFG_DEV = section("developerServer")
 DEFAULT_HOST = (os.environ.get("NP_HW3_DEV_HOST") or get_str(_CFG_DEV, "host") or "127.0.0.1")
 DEFAULT_PORT = int(os.environ.get("NP_HW3_DEV_PORT") or get_int(_CFG_DEV, "port") or 10102)
 
-RAW_CHUNK = 32 * 1024
+RAW_CHUNK = MAX_FRAME  # raw bytes per game_upload_chunk_bin payload frame
+UPLOAD_ACK_EVERY = 16  # chunks sent before waiting for an ack
 
 ERROR_MESSAGES = {
     "missing_fields": "Missing required fields.",
@@ -55,16 +55,19 @@ ERROR_MESSAGES = {
 
 
 def sha256_file(path: Path) -> Tuple[str, int]:
-    h = hashlib.sha256()
-    size = 0
     with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if hasattr(hashlib, "file_digest"):  # 3.11+: hashed in C with the GIL released
+            return hashlib.file_digest(f, "sha256").hexdigest(), size
+        h = hashlib.sha256()
+        buf = bytearray(1024 * 1024)
+        view = memoryview(buf)
         while True:
-            b = f.read(64 * 1024)
-            if not b:
+            n = f.readinto(buf)
+            if not n:
                 break
-            h.update(b)
-            size += len(b)
-    return h.hexdigest(), size
+            h.update(view[:n])
+        return h.hexdigest(), size
 
 
 def zip_dir(src_dir: Path, out_zip: Path) -> None:
@@ -104,6 +107,17 @@ class DevClient:
             raise RuntimeError("server_closed")
         return resp
 
+    def send_binary(self, typ: str, data: dict, payload: bytes) -> None:
+        assert self.sock
+        send_binary_frame_sync(self.sock, {"type": typ, "data": data}, payload)
+
+    def recv(self) -> dict:
+        assert self.sock
+        resp = recv_json_sync(self.sock)
+        if resp is None:
+            raise RuntimeError("server_closed")
+        return resp
+
     def _print_resp(self, resp: dict):
         if resp.get("ok"):
             print("[OK]")
@@ -317,6 +331,7 @@ class DevClient:
                 "clientType": manifest.clientType,
                 "minPlayers": manifest.minPlayers,
                 "maxPlayers": manifest.maxPlayers,
+                "ackEvery": UPLOAD_ACK_EVERY,
             }
 
             init = self.req(
@@ -333,21 +348,28 @@ class DevClient:
             else:
                 print(f"[DevClient] uploading new version for gameId: {assigned_game_id}")
 
+            chunk_size = min(int(init.get("recommendedChunkSize") or RAW_CHUNK), MAX_FRAME)
+            # The server acks every `ack_every` chunks (and the last one); errors
+            # come back immediately, one per chunk from the failing one onwards.
+            ack_every = max(int(init.get("ackEvery") or 1), 1)
             seq = 0
             sent = 0
             with zip_path.open("rb") as f:
                 while True:
-                    chunk = f.read(RAW_CHUNK)
+                    chunk = f.read(chunk_size)
                     if not chunk:
                         break
-                    b64 = base64.b64encode(chunk).decode("ascii")
-                    r = self.req("game_upload_chunk", {"uploadId": upload_id, "seq": seq, "dataB64": b64})
-                    if not r.get("ok"):
-                        self._print_resp(r)
-                        return
-                    seq += 1
+                    self.send_binary("game_upload_chunk_bin", {"uploadId": upload_id, "seq": seq}, chunk)
                     sent += len(chunk)
-                    print(f"\rUploading... {sent}/{size} bytes", end="")
+                    if (seq + 1) % ack_every == 0 or sent == size:
+                        r = self.recv()
+                        if not r.get("ok"):
+                            for _ in range(seq - int(r.get("seq", seq))):
+                                self.recv()
+                            self._print_resp(r)
+                            return
+                        print(f"\rUploading... {sent}/{size} bytes", end="")
+                    seq += 1
             print()
             fin = self.req("game_upload_finish", {"uploadId": upload_id, "changelog": changelog})
             self._print_resp(fin)
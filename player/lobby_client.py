@@ -12,7 +12,6 @@ Connects to Lobby Server and supports (minimal scaffold):
 
 from __future__ import annotations
 
-import base64
 import hashlib
 import json
 import os
@@ -25,11 +24,12 @@ import threading
 import time
 import shutil
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 from hw3.common.config import get_int, get_str, section
-from hw3.common.framing import recv_json_sync, send_json_sync, safe_json_dumps
+from hw3.common.framing import recv_frame_sync, recv_json_sync, send_json_sync, safe_json_dumps
 from hw3.common.manifest import load_manifest_from_dir
 
 
@@ -40,6 +40,27 @@ DEFAULT_PORT = int(os.environ.get("NP_HW3_LOBBY_PORT") or get_int(_CFG_LOBBY, "p
 DOWNLOADS_ROOT = Path(os.environ.get("NP_HW3_DOWNLOADS_ROOT", str(Path(__file__).resolve().parent / "downloads")))
 REVIEW_DRAFTS_ROOT = Path(os.environ.get("NP_HW3_REVIEW_DRAFTS_ROOT", str(DOWNLOADS_ROOT / "_review_drafts")))
 
+# NP_HW3_SCRIPT=1: non-interactive mode for tests/benchmarks; commands are read
+# straight from stdin, bypassing readline and terminal line editing.
+SCRIPT_MODE = os.environ.get("NP_HW3_SCRIPT") == "1"
+MENU_CHOICES = ("0", "1", "2", "3", "4", "5")
+
+# A prefetched room list is shown for "List rooms" only if its reply arrived at
+# most this many seconds ago; an older one is fetched again.
+PREFETCH_MAX_AGE = 2.0
+# Bytes requested per store_download_stream call (streamed as back-to-back frames).
+DOWNLOAD_WINDOW = 4 * 1024 * 1024
+
+MENU_MAIN = "\n=== Main Menu ===\n1) Auth\n2) Lobby status\n3) Store\n4) Rooms\n5) Reviews\n0) Quit\n"
+MENU_AUTH = "\n=== Auth ===\n1) Register\n2) Login\n3) Logout\n0) Back\n"
+MENU_LOBBY = "\n=== Lobby Status ===\n1) List online players\n0) Back\n"
+MENU_STORE = "\n=== Store ===\n1) List games\n2) Game detail\n3) Download/update game\n0) Back\n"
+MENU_ROOMS = (
+    "\n=== Rooms ===\n1) List rooms\n2) Create room\n3) Join room\n4) Leave room\n"
+    "5) Start match (host)\n0) Back\n"
+)
+MENU_REVIEWS = "\n=== Reviews ===\n1) Rate/comment a game\n2) My match history\n0) Back\n"
+
 ERROR_MESSAGES = {
     "missing_fields": "Missing required fields.",
     "bad_request": "Bad request.",
@@ -59,15 +80,53 @@ ERROR_MESSAGES = {
 }
 
 
+def _input(prompt: str = "") -> str:
+    if not SCRIPT_MODE:
+        return input(prompt)
+    if prompt:
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip("\n")
+
+
+def _menu(text: str) -> str:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+    return _input("Choose: ").strip()
+
+
+def _init_readline() -> None:
+    if SCRIPT_MODE or not sys.stdin.isatty():
+        return
+    try:
+        import readline
+    except ImportError:  # pragma: no cover (e.g. Windows)
+        return
+
+    def complete(text: str, state: int) -> Optional[str]:
+        matches = [c for c in MENU_CHOICES if c.startswith(text)]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
+
+
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with path.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):  # 3.11+: hashed in C with the GIL released
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        buf = bytearray(1024 * 1024)
+        view = memoryview(buf)
         while True:
-            b = f.read(64 * 1024)
-            if not b:
+            n = f.readinto(buf)
+            if not n:
                 break
-            h.update(b)
-    return h.hexdigest()
+            h.update(view[:n])
+        return h.hexdigest()
 
 
 def _safe_extract_zip(zip_path: Path, dst_dir: Path) -> None:
@@ -108,6 +167,7 @@ class LobbyClient:
         self.lock = threading.Lock()
 
         self.responses: "queue.Queue[dict]" = queue.Queue()
+        self.prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
 
         self.player_id: Optional[int] = None
         self.username: Optional[str] = None
@@ -124,6 +184,7 @@ class LobbyClient:
 
     def close(self):
         self.alive = False
+        self.prefetcher.shutdown(wait=False, cancel_futures=True)
         if self.sock:
             try:
                 self.sock.close()
@@ -140,7 +201,12 @@ class LobbyClient:
                     break
                 if msg.get("type") == "event":
                     self._handle_event(msg)
+                elif msg.get("type") == "events":  # several events batched into one frame
+                    for item in msg.get("items") or []:
+                        self._handle_event(item)
                 else:
+                    if msg.get("payloadLength"):  # raw bytes follow as one or more frames
+                        msg["payload"] = self._recv_payload(int(msg["payloadLength"]))
                     self.responses.put(msg)
             except socket.timeout:
                 continue
@@ -148,6 +214,21 @@ class LobbyClient:
                 time.sleep(0.2)
         self.alive = False
 
+    def _recv_payload(self, size: int) -> bytes:
+        assert self.sock
+        parts = []
+        got = 0
+        while got < size and self.alive:
+            try:
+                part = recv_frame_sync(self.sock)
+            except socket.timeout:
+                continue
+            if part is None:
+                break
+            parts.append(part)
+            got += len(part)
+        return b"".join(parts)
+
     def _wait_response(self, timeout: float = 5.0) -> Optional[dict]:
         try:
             return self.responses.get(timeout=timeout)
@@ -156,13 +237,31 @@ class LobbyClient:
 
     def request(self, typ: str, data: dict | None = None, timeout: float = 10.0) -> dict:
         assert self.sock
+        # Responses carry no id, so send + wait must be atomic when several threads
+        # (menu, prefetch, auto-launch) talk to the lobby at once.
         with self.lock:
             send_json_sync(self.sock, {"type": typ, "data": (data or {})})
-        resp = self._wait_response(timeout=timeout)
+            resp = self._wait_response(timeout=timeout)
         if resp is None:
             raise RuntimeError("timeout_or_disconnect")
         return resp
 
+    def _timed_request(self, typ: str, data: dict | None = None) -> tuple[float, dict]:
+        resp = self.request(typ, data)
+        return time.monotonic(), resp
+
+    def prefetch(self, typ: str, data: dict | None = None) -> "Future[tuple[float, dict]]":
+        return self.prefetcher.submit(self._timed_request, typ, data)
+
+    def take_prefetched(self, pending: "Future[tuple[float, dict]]", typ: str, data: dict | None = None) -> dict:
+        try:
+            arrived, resp = pending.result(timeout=10.0)
+            if time.monotonic() - arrived <= PREFETCH_MAX_AGE:
+                return resp
+        except Exception:
+            pass
+        return self.request(typ, data)
+
     # -------------------------
     # Events
     # -------------------------
@@ -175,15 +274,10 @@ class LobbyClient:
             # separate thread so the reader loop can keep consuming messages.
             threading.Thread(target=self._auto_launch_game_safe, args=(data,), daemon=True).start()
         elif name == "game_ready":
-            print(f"\n[EVENT] game_ready: room {data.get('roomId')}")
-            try:
-                rid = int(data.get("roomId") or 0)
-                if rid > 0:
-                    # Helpful UX: show current room status after a match ends.
-                    self.do_room_detail(rid)
-                    print("[EVENT] You can start another match now.", flush=True)
-            except Exception:
-                pass
+            # The room_updated event that follows shows the room status.
+            print(f"\n[EVENT] game_ready: room {data.get('roomId')}. You can start another match now.")
+        elif name == "room_updated":
+            self._print_room(data.get("room") or {})
         elif name == "player_joined":
             print(f"\n[EVENT] player_joined: {data}")
         elif name == "player_left":
@@ -272,7 +366,7 @@ class LobbyClient:
         if interactive and version is not None and "version" not in init_req:
             local_best = self._best_local_version(game_id)
             if local_best and local_best != version:
-                ans = input(f"Local version is v{local_best}, server has v{version}. Update? (Y/n): ").strip().lower()
+                ans = _input(f"Local version is v{local_best}, server has v{version}. Update? (Y/n): ").strip().lower()
                 if ans == "n":
                     existing = self._installed_dir(game_id, local_best)
                     root = _resolve_package_root(existing)
@@ -294,13 +388,13 @@ class LobbyClient:
             with tmp_zip.open("wb") as f:
                 while True:
                     r = self.request(
-                        "store_download_chunk",
-                        {"downloadId": download_id, "offset": offset, "limit": 32 * 1024},
-                        timeout=10.0,
+                        "store_download_stream",
+                        {"downloadId": download_id, "offset": offset, "limit": DOWNLOAD_WINDOW},
+                        timeout=30.0,
                     )
                     if not r.get("ok"):
                         raise RuntimeError(r.get("error"))
-                    chunk = base64.b64decode((r.get("dataB64") or "").encode("ascii"))
+                    chunk = r.get("payload") or b""
                     f.write(chunk)
                     offset += len(chunk)
                     done = bool(r.get("done"))
@@ -399,7 +493,7 @@ class LobbyClient:
                 r = self.request("store_list_games")
             except Exception:
                 print("[ERR] Failed to load game list (timeout/disconnect).")
-                retry = input("Retry? (y/N): ").strip().lower()
+                retry = _input("Retry? (y/N): ").strip().lower()
                 if retry in ("y", "yes"):
                     continue
                 return None
@@ -407,7 +501,7 @@ class LobbyClient:
                 break
             self._print_resp(r)
             print("[ERR] Failed to load game list.")
-            retry = input("Retry? (y/N): ").strip().lower()
+            retry = _input("Retry? (y/N): ").strip().lower()
             if retry in ("y", "yes"):
                 continue
             return None
@@ -424,7 +518,7 @@ class LobbyClient:
             if g.get("minPlayers") is not None and g.get("maxPlayers") is not None:
                 players = f"{g.get('minPlayers')}-{g.get('maxPlayers')}"
             print(f"  {i}) {gid} | {name} | latest={latest} | players={players}")
-        s = input(f"{prompt}(1-{len(games)} or blank to cancel): ").strip()
+        s = _input(f"{prompt}(1-{len(games)} or blank to cancel): ").strip()
         if not s:
             return None
         try:
@@ -443,14 +537,14 @@ class LobbyClient:
                 r = self.request("store_list_games")
             except Exception:
                 print("[ERR] Failed to load game list (timeout/disconnect).")
-                retry = input("Retry? (y/N): ").strip().lower()
+                retry = _input("Retry? (y/N): ").strip().lower()
                 if retry in ("y", "yes"):
                     continue
                 return
             self._print_resp(r)
             if not r.get("ok"):
                 print("[ERR] Failed to load game list.")
-                retry = input("Retry? (y/N): ").strip().lower()
+                retry = _input("Retry? (y/N): ").strip().lower()
                 if retry in ("y", "yes"):
                     continue
                 return
@@ -539,14 +633,14 @@ class LobbyClient:
         print(f"Installed at: {d}")
 
     def do_register(self):
-        u = input("username: ").strip()
-        p = input("password: ").strip()
+        u = _input("username: ").strip()
+        p = _input("password: ").strip()
         r = self.request("player_register", {"username": u, "password": p})
         self._print_resp(r)
 
     def do_login(self):
-        u = input("username: ").strip()
-        p = input("password: ").strip()
+        u = _input("username: ").strip()
+        p = _input("password: ").strip()
         r = self.request("player_login", {"username": u, "password": p})
         if r.get("ok"):
             self.player_id = int(r.get("playerId"))
@@ -579,8 +673,9 @@ class LobbyClient:
                 status = "in lobby"
             print(f"  - #{p.get('playerId')} {p.get('username')} ({status})")
 
-    def do_room_list(self):
-        r = self.request("room_list", {})
+    def do_room_list(self, r: Optional[dict] = None):
+        if r is None:
+            r = self.request("room_list", {})
         self._print_resp(r)
         rooms = r.get("rooms") or []
         if not rooms:
@@ -606,13 +701,13 @@ class LobbyClient:
                 self._ensure_installed_for_room(game_id=str(room.get("gameId")), version=str(room.get("version")))
 
     def do_room_join(self):
-        rid = int(input("roomId: ").strip())
+        rid = int(_input("roomId: ").strip())
         r = self.request("room_join", {"roomId": rid})
         if r.get("ok"):
             self.room_id = rid
         self._print_resp(r)
         if r.get("ok"):
-            room = self.do_room_detail(rid)
+            room = r.get("room") or self.do_room_detail(rid)
             if room:
                 self._ensure_installed_for_room(game_id=str(room.get("gameId")), version=str(room.get("version")))
 
@@ -623,7 +718,7 @@ class LobbyClient:
         self._print_resp(r)
 
     def do_room_start(self):
-        rid = self.room_id or int(input("roomId: ").strip())
+        rid = self.room_id or int(_input("roomId: ").strip())
         r = self.request("room_start", {"roomId": rid})
         self._print_resp(r)
         if (not r.get("ok")) and r.get("error") == "already_playing":
@@ -650,16 +745,16 @@ class LobbyClient:
                 draft = None
 
         if draft:
-            use = input(f"Found saved draft for {gid}. Use it? (y/N): ").strip().lower()
+            use = _input(f"Found saved draft for {gid}. Use it? (y/N): ").strip().lower()
             if use == "y":
                 rating = int(draft.get("rating") or 0)
                 comment = str(draft.get("comment") or "")
             else:
-                rating = int(input("rating (1-5): ").strip())
-                comment = input("comment: ").strip()
+                rating = int(_input("rating (1-5): ").strip())
+                comment = _input("comment: ").strip()
         else:
-            rating = int(input("rating (1-5): ").strip())
-            comment = input("comment: ").strip()
+            rating = int(_input("rating (1-5): ").strip())
+            comment = _input("comment: ").strip()
 
         # Best-effort: store draft before sending so failures don't lose input.
         try:
@@ -689,11 +784,15 @@ class LobbyClient:
         if not r.get("ok"):
             return None
         room = r.get("room") or {}
+        self._print_room(room)
+        return room
+
+    def _print_room(self, room: dict):
         print(
             f"Room {room.get('id')} | game={room.get('gameId')} v{room.get('version')} "
-            f"| status={room.get('status')} | host={room.get('hostPlayerId')} | players={room.get('players')}"
+            f"| status={room.get('status')} | host={room.get('hostPlayerId')} | players={room.get('players')}",
+            flush=True,
         )
-        return room
 
     def do_match_history(self):
         r = self.request("match_list_mine", {})
@@ -724,14 +823,11 @@ class LobbyClient:
     def run(self):
         DOWNLOADS_ROOT.mkdir(parents=True, exist_ok=True)
         while True:
-            print("\n=== Main Menu ===")
-            print("1) Auth")
-            print("2) Lobby status")
-            print("3) Store")
-            print("4) Rooms")
-            print("5) Reviews")
-            print("0) Quit")
-            cmd = input("Choose: ").strip()
+            try:
+                cmd = _menu(MENU_MAIN)
+            except (EOFError, KeyboardInterrupt):
+                print()
+                return
             try:
                 if cmd == "1":
                     self._menu_auth()
@@ -745,7 +841,7 @@ class LobbyClient:
                     self._menu_reviews()
                 elif cmd == "0":
                     return
-            except KeyboardInterrupt:
+            except (EOFError, KeyboardInterrupt):
                 print()
                 return
             except Exception as e:
@@ -753,12 +849,7 @@ class LobbyClient:
 
     def _menu_auth(self):
         while True:
-            print("\n=== Auth ===")
-            print("1) Register")
-            print("2) Login")
-            print("3) Logout")
-            print("0) Back")
-            cmd = input("Choose: ").strip()
+            cmd = _menu(MENU_AUTH)
             if cmd == "1":
                 self.do_register()
             elif cmd == "2":
@@ -770,10 +861,7 @@ class LobbyClient:
 
     def _menu_lobby(self):
         while True:
-            print("\n=== Lobby Status ===")
-            print("1) List online players")
-            print("0) Back")
-            cmd = input("Choose: ").strip()
+            cmd = _menu(MENU_LOBBY)
             if cmd == "1":
                 self.do_player_list()
             elif cmd == "0":
@@ -781,12 +869,7 @@ class LobbyClient:
 
     def _menu_store(self):
         while True:
-            print("\n=== Store ===")
-            print("1) List games")
-            print("2) Game detail")
-            print("3) Download/update game")
-            print("0) Back")
-            cmd = input("Choose: ").strip()
+            cmd = _menu(MENU_STORE)
             if cmd == "1":
                 self.show_games()
             elif cmd == "2":
@@ -797,17 +880,16 @@ class LobbyClient:
                 return
 
     def _menu_rooms(self):
+        cmd = None
         while True:
-            print("\n=== Rooms ===")
-            print("1) List rooms")
-            print("2) Create room")
-            print("3) Join room")
-            print("4) Leave room")
-            print("5) Start match (host)")
-            print("0) Back")
-            cmd = input("Choose: ").strip()
+            # Someone who just listed rooms usually lists them again (watching for
+            # a room to join): fetch the next list while they read the menu. A
+            # different choice made before that reply arrives waits for it, since
+            # request() holds the lock until its response is in.
+            pending = self.prefetch("room_list", {}) if cmd == "1" else None
+            cmd = _menu(MENU_ROOMS)
             if cmd == "1":
-                self.do_room_list()
+                self.do_room_list(self.take_prefetched(pending, "room_list", {}) if pending else None)
             elif cmd == "2":
                 self.do_room_create()
             elif cmd == "3":
@@ -821,11 +903,7 @@ class LobbyClient:
 
     def _menu_reviews(self):
         while True:
-            print("\n=== Reviews ===")
-            print("1) Rate/comment a game")
-            print("2) My match history")
-            print("0) Back")
-            cmd = input("Choose: ").strip()
+            cmd = _menu(MENU_REVIEWS)
             if cmd == "1":
                 self.do_review()
             elif cmd == "2":
@@ -837,6 +915,7 @@ class LobbyClient:
 def main():
     host = sys.argv[1] if len(sys.argv) >= 2 else DEFAULT_HOST
     port = int(sys.argv[2]) if len(sys.argv) >= 3 else DEFAULT_PORT
+    _init_readline()
     c = LobbyClient(host, port)
     c.connect()
     try:
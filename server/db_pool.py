@@ -0,0 +1,134 @@
+"""
+Persistent, pipelined connections to the DB server.
+
+db_call() used to open a fresh TCP connection (plus codec handshake) per RPC.
+DbPool keeps up to `size` connections open. Each connection carries many
+requests at once: the DB server answers a connection's requests strictly in
+the order it received them (see DbProtocol), so replies are matched to waiting
+callers first-in, first-out by a per-connection reader task.
+
+Requests issued in the same event-loop pass are written together: call()
+queues its frame and the first caller schedules one writelines() for the
+lot, so a burst of db_call()s costs one send() here and arrives at the DB
+server as one read, whose replies it also writes back in one go.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+from hw3.common.framing import FramingError, recv_frame
+
+
+class DbNoResponse(ConnectionError):
+    """The connection closed before this request was answered."""
+
+
+Connector = Callable[[], Awaitable[Tuple[asyncio.StreamReader, asyncio.StreamWriter, int]]]
+
+
+class PipelinedConn:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, codec: int):
+        self.reader = reader
+        self.writer = writer
+        self.codec = codec
+        self.closed = False
+        self._pending: Deque["asyncio.Future[bytes]"] = deque()
+        self._outbox: List[bytes] = []  # frames waiting for the scheduled _flush()
+        self._loop = asyncio.get_running_loop()
+        self._reader_task = self._loop.create_task(self._reader_loop())
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+
+    async def _reader_loop(self) -> None:
+        try:
+            while True:
+                data = await recv_frame(self.reader)
+                if data is None or not self._pending:
+                    break  # server closed, or a reply nobody asked for
+                fut = self._pending.popleft()
+                if not fut.done():  # the caller may have been cancelled
+                    fut.set_result(data)
+        except (ConnectionError, FramingError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.close()
+
+    async def call(self, frame: bytes) -> bytes:
+        """Send one encoded request frame and wait for its reply frame."""
+        await self.writer.drain()  # only waits while the transport is paused
+        if self.closed:
+            raise DbNoResponse()
+        fut: "asyncio.Future[bytes]" = self._loop.create_future()
+        self._pending.append(fut)
+        if not self._outbox:
+            self._loop.call_soon(self._flush)
+        self._outbox.append(frame)
+        return await fut
+
+    def _flush(self) -> None:
+        out, self._outbox = self._outbox, []
+        if out and not self.closed:
+            self.writer.writelines(out)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._outbox.clear()
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(DbNoResponse())
+        with contextlib.suppress(Exception):
+            self.writer.close()
+
+
+class DbPool:
+    def __init__(self, connect: Connector, size: int = 10):
+        self.connect = connect
+        self.size = max(1, size)
+        self._conns: List[PipelinedConn] = []
+        self._opening: Set["asyncio.Task[PipelinedConn]"] = set()
+
+    async def _open(self) -> PipelinedConn:
+        reader, writer, codec = await self.connect()
+        conn = PipelinedConn(reader, writer, codec)
+        self._conns.append(conn)
+        return conn
+
+    def _start_open(self) -> "asyncio.Task[PipelinedConn]":
+        """Begin a connect that counts against `size` until it finishes."""
+        task = asyncio.get_running_loop().create_task(self._open())
+        self._opening.add(task)
+        task.add_done_callback(self._opening.discard)
+        return task
+
+    async def get(self) -> PipelinedConn:
+        """Least-loaded open connection; a new one while under `size` and all are busy."""
+        while True:
+            self._conns = [c for c in self._conns if not c.closed]
+            best: Optional[PipelinedConn] = min(self._conns, key=lambda c: c.inflight, default=None)
+            if best is not None and (best.inflight == 0 or len(self._conns) + len(self._opening) >= self.size):
+                return best
+            if len(self._conns) + len(self._opening) < self.size:
+                return await asyncio.shield(self._start_open())
+            # At the limit with every slot still connecting: wait for one.
+            await asyncio.wait(set(self._opening), return_when=asyncio.FIRST_COMPLETED)
+
+    async def warm(self) -> int:
+        """Open the whole pool up front so early requests skip the connect; best effort."""
+        missing = self.size - len(self._conns) - len(self._opening)
+        tasks = [self._start_open() for _ in range(missing)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return sum(1 for r in results if isinstance(r, PipelinedConn))
+
+    def close_all(self) -> None:
+        for conn in self._conns:
+            conn.close()
+        self._conns.clear()
@@ -1,31 +1,167 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
-import json
 import os
-from typing import Any, Dict
+import sys
+from typing import Any, Callable, Coroutine, Dict, Optional
 
 from hw3.common.config import get_int, get_str, section
-from hw3.common.framing import recv_frame, send_frame
+from hw3.common.framing import HDR, MAX_FRAME, FramingError, json_dumps, json_loads, recv_frame, send_frame, set_low_latency
+from hw3.server.db_pool import DbNoResponse, DbPool
+
+try:  # optional: binary codec for DB RPC payloads
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+try:  # optional: faster event loop
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
 
 
 _CFG_DB = section("db")
 DB_HOST = (os.environ.get("NP_HW3_DB_HOST") or get_str(_CFG_DB, "host") or "127.0.0.1")
 DB_PORT = int(os.environ.get("NP_HW3_DB_PORT") or get_int(_CFG_DB, "port") or 10101)
+DB_POOL_SIZE = int(os.environ.get("NP_HW3_DB_POOL_SIZE") or get_int(_CFG_DB, "poolSize") or 10)
 
+# Codec negotiation: a client that wants something other than JSON opens the
+# connection with a 1-byte hello frame carrying the codec id; the server answers
+# with a 1-byte frame holding the codec it will use. JSON payloads are never a
+# single byte, so a plain JSON client needs no handshake at all.
+CODEC_JSON = 0x01
+CODEC_MSGPACK = 0x02
 
-async def db_call(payload: Dict[str, Any]) -> Dict[str, Any]:
+_CODEC_NAMES = {"json": CODEC_JSON, "msgpack": CODEC_MSGPACK}
+
+# Replies bigger than this (e.g. match history) are decoded off the event loop.
+LARGE_DECODE_THRESHOLD = 32 * 1024
+
+
+def codec_supported(codec: int) -> bool:
+    if codec == CODEC_JSON:
+        return True
+    if codec == CODEC_MSGPACK:
+        return msgspec is not None
+    return False
+
+
+def _preferred_codec() -> int:
+    name = (os.environ.get("NP_HW3_DB_CODEC") or get_str(_CFG_DB, "codec") or "json").lower()
+    codec = _CODEC_NAMES.get(name, CODEC_JSON)
+    return codec if codec_supported(codec) else CODEC_JSON
+
+
+DB_CODEC = _preferred_codec()
+_MSGPACK_ENCODER = msgspec.msgpack.Encoder() if msgspec is not None else None
+
+
+def encode_payload(obj: Any, codec: int = CODEC_JSON) -> bytes:
+    if codec == CODEC_MSGPACK:
+        return _MSGPACK_ENCODER.encode(obj)
+    return json_dumps(obj)
+
+
+def encode_frame(obj: Any, codec: int = CODEC_JSON) -> bytearray:
+    """Encode obj directly behind a 4-byte length prefix: one buffer per frame.
+
+    A fresh buffer is used each time because the transport may keep a reference
+    to it until the bytes actually leave the socket.
+    """
+    buf = bytearray(HDR.size)
+    if codec == CODEC_MSGPACK:
+        _MSGPACK_ENCODER.encode_into(obj, buf, HDR.size)
+    else:
+        buf += encode_payload(obj, codec)
+    size = len(buf) - HDR.size
+    if not size or size > MAX_FRAME:
+        raise FramingError("bad frame size")
+    HDR.pack_into(buf, 0, size)
+    return buf
+
+
+def decode_payload(data: bytes, codec: int = CODEC_JSON) -> Any:
+    if codec == CODEC_MSGPACK:
+        return msgspec.msgpack.decode(data)
+    return json_loads(data)
+
+
+def table_rows(table: Any) -> list[Dict[str, Any]]:
+    """Expand a {"cols", "rows"} result table from the DB server into row dicts."""
+    if not table:
+        return []
+    if isinstance(table, list):  # already row dicts
+        return table
+    cols = table.get("cols") or []
+    return [dict(zip(cols, row)) for row in table.get("rows") or []]
+
+
+async def _negotiate(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, codec: int) -> int:
+    if codec == CODEC_JSON:
+        return CODEC_JSON
+    await send_frame(writer, bytes([codec]))
+    ack = await recv_frame(reader)
+    if not ack or len(ack) != 1 or not codec_supported(ack[0]):
+        return CODEC_JSON
+    return ack[0]
+
+
+async def open_db_connection() -> tuple[asyncio.StreamReader, asyncio.StreamWriter, int]:
+    """Connect to the DB server, tune the socket and negotiate the codec (once per connection)."""
     reader, writer = await asyncio.open_connection(DB_HOST, DB_PORT)
+    set_low_latency(writer.get_extra_info("socket"))
     try:
-        await send_frame(writer, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
-        data = await recv_frame(reader)
-        if not data:
-            return {"status": "ERR", "error": "db_no_response"}
-        return json.loads(data.decode("utf-8"))
+        codec = await _negotiate(reader, writer, DB_CODEC)
+    except Exception:
+        writer.close()
+        raise
+    return reader, writer, codec
+
+
+DB_POOL = DbPool(open_db_connection, size=DB_POOL_SIZE)
+
+
+async def db_call(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """One request/response, pipelined on a pooled DB connection."""
+    try:
+        conn = await DB_POOL.get()
+        data = await conn.call(encode_frame(payload, conn.codec))
+    except DbNoResponse:
+        return {"status": "ERR", "error": "db_no_response"}
     except Exception as e:
         return {"status": "ERR", "error": f"db_error:{e}"}
+    if len(data) > LARGE_DECODE_THRESHOLD:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, decode_payload, data, conn.codec)
+    return decode_payload(data, conn.codec)
+
+
+# -------------------------
+# Event loop selection
+# -------------------------
+def _loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    # uvloop is used whenever it is installed, unless NP_HW3_UVLOOP=0.
+    if uvloop is not None and os.environ.get("NP_HW3_UVLOOP") != "0":
+        return uvloop.new_event_loop
+    return None
+
+
+def run_event_loop(main: Coroutine[Any, Any, Any]) -> Any:
+    """asyncio.run() replacement that honours the loop selection above."""
+    factory = _loop_factory()
+    if factory is None:
+        return asyncio.run(main)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=factory) as runner:
+            return runner.run(main)
+    loop = factory()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main)
     finally:
-        with contextlib.suppress(Exception):
-            writer.close()
-            await writer.wait_closed()
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
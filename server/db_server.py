@@ -2,7 +2,8 @@
 """
 HW3 DB Server (internal service)
 
-- TCP + length-prefixed JSON frames (see hw3/common/framing.py)
+- TCP + length-prefixed JSON frames (see hw3/common/framing.py); MessagePack
+  when a client negotiates it (see hw3/server/db_rpc.py)
 - SQLite persistence (data survives restart)
 
 This server is intentionally "thin": it exposes CRUD/query actions needed by
@@ -12,39 +13,129 @@ the Lobby Server and Developer Server.
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 import contextlib
+import functools
 import hashlib
 import hmac
-import json
+import multiprocessing
 import os
+import queue
+import signal
+import socket
 import sqlite3
+import threading
 import time
+import traceback
+from collections import OrderedDict, defaultdict, deque
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, DefaultDict, Deque, Dict, Iterator, Optional, Union
 
-from hw3.common.framing import FramingError, recv_frame, send_frame
+from hw3.common.framing import HDR, MAX_FRAME, FramingError, json_loads, set_low_latency
 from hw3.common.config import get_int, get_str, resolve_path, section
+from hw3.server.db_rpc import CODEC_JSON, CODEC_MSGPACK, codec_supported, decode_payload, encode_frame, run_event_loop
 
 
 PBKDF2_ITER = 120_000
 SALT_LEN = 16
 
+# Stored pw_hash = algorithm tag byte + 32-byte key. New hashes use scrypt;
+# PBKDF2 rows (tagged or legacy untagged) are upgraded on the next login.
+ALG_PBKDF2 = 0x01
+ALG_SCRYPT = 0x02
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
 
 def now_ts() -> int:
     return int(time.time())
 
 
-def _pbkdf2_hash(password: str, salt: bytes) -> bytes:
-    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ITER)
+# Successful verifies are remembered for a while so repeat logins skip the
+# (deliberately slow) key derivation. Keys are HMACs under a per-process
+# secret, so no password (or unsalted password digest) is held in memory.
+VERIFY_CACHE_MAX = 1024
+VERIFY_CACHE_TTL = 600.0
+_VERIFY_CACHE: "OrderedDict[bytes, tuple[bytes, float]]" = OrderedDict()
+_VERIFY_CACHE_SECRET = os.urandom(32)
+
+
+_HASH_POOL: Optional[concurrent.futures.Executor] = None
+
+
+def _hash_pool() -> concurrent.futures.Executor:
+    """PBKDF2 runs in worker processes so auth never stalls the event loop."""
+    global _HASH_POOL
+    if _HASH_POOL is None:
+        try:
+            # spawn, not fork: forked workers would inherit the listening socket
+            # and every pipe end, so they outlive a SIGTERM'd server and keep
+            # its port bound.
+            _HASH_POOL = concurrent.futures.ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+        except (OSError, NotImplementedError):
+            # e.g. no working multiprocessing semaphores; pbkdf2_hmac still drops the GIL
+            _HASH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _HASH_POOL
+
+
+def _shutdown_hash_pool() -> None:
+    global _HASH_POOL
+    if _HASH_POOL is not None:
+        _HASH_POOL.shutdown(wait=False, cancel_futures=True)
+        _HASH_POOL = None
+
+
+async def _derive(alg: int, password: str, salt: bytes) -> bytes:
+    pw = password.encode("utf-8")
+    if alg == ALG_SCRYPT:
+        fn = functools.partial(hashlib.scrypt, pw, salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32)
+    else:
+        fn = functools.partial(hashlib.pbkdf2_hmac, "sha256", pw, salt, PBKDF2_ITER, 32)
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool(), fn)
+
+
+async def _hash_password(password: str, salt: bytes) -> bytes:
+    """Tagged hash for storage: 1 algorithm byte + 32-byte key."""
+    return bytes([ALG_SCRYPT]) + await _derive(ALG_SCRYPT, password, salt)
+
+
+def _split_stored_hash(stored: bytes) -> tuple[int, bytes]:
+    if len(stored) == 32:  # rows written before hashes were tagged
+        return ALG_PBKDF2, stored
+    return stored[0], stored[1:]
 
 
 def _gen_salt() -> bytes:
     return os.urandom(SALT_LEN)
 
 
-def _verify_password(password: str, salt: bytes, pw_hash: bytes) -> bool:
-    test = _pbkdf2_hash(password, salt)
-    return hmac.compare_digest(test, pw_hash)
+def _verify_cache_key(password: str, salt: bytes) -> bytes:
+    return hmac.digest(_VERIFY_CACHE_SECRET, salt + password.encode("utf-8"), "sha256")
+
+
+async def _verify_password(password: str, salt: bytes, stored: bytes) -> tuple[bool, Optional[bytes]]:
+    """Return (ok, upgraded); upgraded is a new stored hash when the row used an older algorithm."""
+    key = _verify_cache_key(password, salt)
+    hit = _VERIFY_CACHE.get(key)
+    if hit is not None and hit[1] > time.monotonic():
+        if hmac.compare_digest(hit[0], stored):
+            _VERIFY_CACHE.move_to_end(key)
+            return True, None
+    alg, expected = _split_stored_hash(stored)
+    if alg not in (ALG_PBKDF2, ALG_SCRYPT):
+        return False, None
+    test = await _derive(alg, password, salt)
+    if not hmac.compare_digest(test, expected):
+        return False, None
+    upgraded = await _hash_password(password, salt) if alg != ALG_SCRYPT else None
+    _VERIFY_CACHE[key] = (upgraded or bytes(stored), time.monotonic() + VERIFY_CACHE_TTL)
+    _VERIFY_CACHE.move_to_end(key)
+    while len(_VERIFY_CACHE) > VERIFY_CACHE_MAX:
+        _VERIFY_CACHE.popitem(last=False)
+    return True, upgraded
 
 
 def _db_path() -> Path:
@@ -63,19 +154,235 @@ DB_PATH = _db_path()
 _CFG_DB = section("db")
 HOST = (os.environ.get("NP_HW3_DB_HOST") or get_str(_CFG_DB, "bindHost") or "0.0.0.0")
 PORT = int(os.environ.get("NP_HW3_DB_PORT") or get_int(_CFG_DB, "port") or 10101)
+# Opt-in: serve from this many forked processes sharing the port via SO_REUSEPORT.
+# A sibling's writes cannot invalidate this process's read cache, so workers
+# run without it (see _serve_workers()).
+WORKERS = max(1, int(os.environ.get("NP_HW3_DB_WORKERS") or get_int(_CFG_DB, "workers") or 1))
+
+
+# Applied to every connection; journal_mode=WAL is persistent and set in init_db().
+_CONN_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class ConnPool:
+    """Reusable SQLite connections so handlers keep their prepared statements."""
+
+    def __init__(self, max_idle: int = 8, cached_statements: int = 256):
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(DB_PATH, cached_statements=self.cached_statements, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONN_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @staticmethod
+    def _close(conn: sqlite3.Connection) -> None:
+        with contextlib.suppress(sqlite3.Error):
+            conn.execute("PRAGMA optimize")
+        conn.close()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.max_idle:
+            self._idle.put(conn)
+        else:
+            self._close(conn)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+_POOL = ConnPool()
+
+# Hot statements, kept as single shared strings so every call hits the
+# per-connection statement cache.
+_SQL: Dict[str, str] = {
+    "dev_exists": "SELECT 1 FROM DevUser WHERE username=?",
+    "dev_auth": "SELECT id,pw_salt,pw_hash FROM DevUser WHERE username=?",
+    "dev_touch_login": "UPDATE DevUser SET lastLoginAt=? WHERE id=?",
+    "dev_set_hash": "UPDATE DevUser SET pw_hash=? WHERE id=?",
+    "player_exists": "SELECT 1 FROM PlayerUser WHERE username=?",
+    "player_auth": "SELECT id,pw_salt,pw_hash FROM PlayerUser WHERE username=?",
+    "player_touch_login": "UPDATE PlayerUser SET lastLoginAt=? WHERE id=?",
+    "player_set_hash": "UPDATE PlayerUser SET pw_hash=? WHERE id=?",
+    "dev_by_username": "SELECT id,username,createdAt,lastLoginAt FROM DevUser WHERE username=?",
+    "dev_by_id": "SELECT id,username,createdAt,lastLoginAt FROM DevUser WHERE id=?",
+    "player_by_username": "SELECT id,username,createdAt,lastLoginAt FROM PlayerUser WHERE username=?",
+    "game_by_gameId": "SELECT * FROM Game WHERE gameId=?",
+    "game_pk": "SELECT id FROM Game WHERE gameId=?",
+    "game_pk_delisted": "SELECT id,delisted FROM Game WHERE gameId=?",
+    "game_owner": "SELECT developerId FROM Game WHERE gameId=?",
+    "version_by_id": "SELECT * FROM GameVersion WHERE id=?",
+    # The LEFT JOIN still yields the Game row when no version matches, so
+    # "no such game", "delisted" and "no such version" stay distinguishable.
+    "version_for_gameId": (
+        "SELECT gv.*, g.delisted AS _delisted FROM Game g"
+        " LEFT JOIN GameVersion gv ON gv.gameFk=g.id AND gv.version=?"
+        " WHERE g.gameId=? LIMIT 1"
+    ),
+    "latest_for_gameId": (
+        "SELECT gv.*, g.delisted AS _delisted FROM Game g"
+        " LEFT JOIN GameVersion gv ON gv.gameFk=g.id"
+        " WHERE g.gameId=? ORDER BY gv.uploadedAt DESC, gv.id DESC LIMIT 1"
+    ),
+    # Exact participant match through the MatchPlayer index (no resultsJson scan).
+    "match_logs_for_player": (
+        "SELECT ml.*, g.gameId AS gameId, gv.version AS version"
+        " FROM MatchPlayer mp"
+        " JOIN MatchLog ml ON ml.id=mp.matchFk"
+        " JOIN Game g ON g.id=ml.gameFk"
+        " JOIN GameVersion gv ON gv.id=ml.gameVersionFk"
+        " WHERE mp.playerId=?"
+        " ORDER BY ml.endedAt DESC, ml.id DESC LIMIT 50"
+    ),
+    "match_player_ins": "INSERT OR IGNORE INTO MatchPlayer(matchFk, playerId) VALUES(?,?)",
+    "room_members": "SELECT playerId FROM RoomMember WHERE roomId=? ORDER BY joinedAt ASC",
+    "all_room_members": "SELECT roomId, playerId FROM RoomMember ORDER BY roomId, joinedAt ASC",
+}
+
+
+@contextlib.contextmanager
+def _get_conn() -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled connection; commit/rollback like `with conn:`, then hand it back.
+
+    On the writer thread this is always the writer's own connection.
+    """
+    pinned = getattr(_WRITER_LOCAL, "conn", None)
+    conn = pinned or _POOL.acquire()
+    try:
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        if conn.in_transaction:
+            conn.commit()
+    finally:
+        if pinned is None:
+            _POOL.release(conn)
+
 
+# -------------------------
+# Writer thread
+# -------------------------
+# All of a process's writes go through one long-lived thread holding one
+# connection, so the event loop never waits on the write lock. Reads stay on
+# the loop, using pooled connections. With db.workers > 1 each worker has its
+# own writer thread; SQLite's WAL lock and busy_timeout serialize them.
+_WRITER_LOCAL = threading.local()
+
+
+class DbWriter:
+    def __init__(self) -> None:
+        self._jobs: Deque[tuple] = deque()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "concurrent.futures.Future[Any]":
+        if self._thread is None:
+            self.start()
+        fut: "concurrent.futures.Future[Any]" = concurrent.futures.Future()
+        self._jobs.append((fut, fn, args))
+        self._wakeup.set()
+        return fut
+
+    def _loop(self) -> None:
+        _WRITER_LOCAL.conn = _POOL._open()
+        jobs = self._jobs
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while jobs:
+                fut, fn, args = jobs.popleft()
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    fut.set_result(fn(*args))
+                except BaseException as e:
+                    fut.set_exception(e)
+
+
+_WRITER = DbWriter()
+
+
+def _run_write(fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+    return asyncio.wrap_future(_WRITER.submit(fn, *args))
+
+
+def _exec_write(*stmts: tuple) -> Optional[int]:
+    """Run (sql, params) statements in one transaction; returns the last lastrowid."""
+    rowid = None
+    with _get_conn() as conn, conn:
+        for sql, params in stmts:
+            rowid = conn.execute(sql, params).lastrowid
+    return rowid
+
+
+_HAS_JSON1 = True
 
-def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+
+def _json1_available(conn: sqlite3.Connection) -> bool:
+    try:
+        return conn.execute("SELECT json_valid('{}')").fetchone()[0] == 1
+    except sqlite3.OperationalError:
+        return False
+
+
+def _match_player_ids(results_json: str) -> set:
+    """Python twin of trg_ml_ins: integer userIds under $.players and $.results."""
+    try:
+        doc = json_loads(results_json.encode("utf-8"))
+    except ValueError:
+        return set()
+    if not isinstance(doc, dict):
+        return set()
+    ids = set()
+    for key in ("players", "results"):
+        entries = doc.get(key)
+        if not isinstance(entries, list):
+            continue
+        for e in entries:
+            uid = e.get("userId") if isinstance(e, dict) else None
+            if isinstance(uid, int) and not isinstance(uid, bool):
+                ids.add(uid)
+    return ids
 
 
 def init_db() -> None:
+    global _HAS_JSON1
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = _get_conn()
-    try:
+    with _get_conn() as conn:
         cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
         # Accounts (separated by role per spec)
         cur.execute(
             """
@@ -196,10 +503,90 @@ def init_db() -> None:
             )
             """
         )
+        # Participants of each match (normalized from resultsJson for indexed lookups)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS MatchPlayer(
+                matchFk INTEGER NOT NULL,
+                playerId INTEGER NOT NULL,
+                PRIMARY KEY(matchFk, playerId)
+            )
+            """
+        )
+        # MatchPlayer rows are derived from resultsJson by SQLite itself (JSON1);
+        # builds without JSON1 fill them from Python in MatchLog.create instead.
+        _HAS_JSON1 = _json1_available(conn)
+        if _HAS_JSON1:
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS trg_ml_ins AFTER INSERT ON MatchLog
+                WHEN json_valid(NEW.resultsJson)
+                BEGIN
+                    INSERT OR IGNORE INTO MatchPlayer(matchFk, playerId)
+                    SELECT NEW.id, json_extract(e.value, '$.userId')
+                    FROM json_each(NEW.resultsJson, '$.players') e
+                    WHERE e.type='object' AND json_type(e.value, '$.userId')='integer'
+                    UNION
+                    SELECT NEW.id, json_extract(e.value, '$.userId')
+                    FROM json_each(NEW.resultsJson, '$.results') e
+                    WHERE e.type='object' AND json_type(e.value, '$.userId')='integer';
+                END
+                """
+            )
+            # Backfill logs written before MatchPlayer existed
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO MatchPlayer(matchFk, playerId)
+                SELECT ml.id, json_extract(e.value, '$.userId')
+                FROM MatchLog ml, json_each(ml.resultsJson, '$.players') e
+                WHERE json_valid(ml.resultsJson) AND e.type='object' AND json_type(e.value, '$.userId')='integer'
+                UNION
+                SELECT ml.id, json_extract(e.value, '$.userId')
+                FROM MatchLog ml, json_each(ml.resultsJson, '$.results') e
+                WHERE json_valid(ml.resultsJson) AND e.type='object' AND json_type(e.value, '$.userId')='integer'
+                """
+            )
+        else:
+            print("[DB] SQLite built without JSON1; MatchPlayer is maintained in Python")
+            cur.execute("DROP TRIGGER IF EXISTS trg_ml_ins")
+            rows = conn.execute("SELECT id, resultsJson FROM MatchLog").fetchall()
+            cur.executemany(
+                _SQL["match_player_ins"],
+                [(r["id"], pid) for r in rows for pid in _match_player_ids(r["resultsJson"])],
+            )
+
+        # Membership changes keep Room.updatedAt fresh without a second statement
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rm_bump AFTER INSERT ON RoomMember
+            BEGIN
+                UPDATE Room SET updatedAt=CAST(strftime('%s','now') AS INTEGER) WHERE id=NEW.roomId;
+            END
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rm_unbump AFTER DELETE ON RoomMember
+            BEGIN
+                UPDATE Room SET updatedAt=CAST(strftime('%s','now') AS INTEGER) WHERE id=OLD.roomId;
+            END
+            """
+        )
+
+        # Secondary indexes backing the list endpoints' WHERE + ORDER BY
+        for ddl in (
+            "CREATE INDEX IF NOT EXISTS idx_game_dev_updated ON Game(developerId, updatedAt DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_gv_gamefk_uploaded ON GameVersion(gameFk, uploadedAt DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_review_gamefk_updated ON Review(gameFk, updatedAt DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_room_status_updated ON Room(status, updatedAt DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_roommember_room_joined ON RoomMember(roomId, joinedAt)",
+            "CREATE INDEX IF NOT EXISTS idx_matchlog_gamefk ON MatchLog(gameFk)",
+            "CREATE INDEX IF NOT EXISTS idx_mp_player_game ON MatchPlayer(playerId, matchFk)",
+        ):
+            cur.execute(ddl)
 
         conn.commit()
-    finally:
-        conn.close()
+        cur.execute("ANALYZE")
 
 
 # -------------------------
@@ -213,57 +600,161 @@ def _ok(**extra: Any) -> Dict[str, Any]:
     return {"status": "OK", **extra}
 
 
+# Replies with no payload beyond the status/error code are encoded once per codec.
+_ERR_CODES = (
+    "bad_credentials", "bad_request", "exception", "game_delisted", "game_exists", "missing_fields",
+    "no_such_version", "no_version", "not_empty", "not_found", "not_owner", "unknown_action",
+    "unknown_collection", "username_exists", "version_exists",
+)
+_PREBUILT: Dict[tuple[int, str, str], bytes] = {}
+
+
+def _prebuilt_frame(resp: Dict[str, Any], codec: int) -> Optional[bytes]:
+    status = resp.get("status")
+    if status == "OK" and len(resp) == 1:
+        code = ""
+    elif status == "ERR" and len(resp) == 2 and isinstance(resp.get("error"), str):
+        code = resp["error"]
+    else:
+        return None
+    frame = _PREBUILT.get((codec, status, code))
+    if frame is None:
+        frame = bytes(encode_frame(resp, codec))
+        if len(_PREBUILT) < 256:
+            _PREBUILT[(codec, status, code)] = frame
+    return frame
+
+
+for _codec in (CODEC_JSON, CODEC_MSGPACK):
+    if codec_supported(_codec):
+        _prebuilt_frame(_ok(), _codec)
+        for _code in _ERR_CODES:
+            _prebuilt_frame(_err(_code), _codec)
+
+
+# Encoded replies for hot catalog reads. Entries carry the catalog version they
+# were built under; any Game/GameVersion write bumps it. Only valid while this
+# process is the sole writer, so it is switched off in worker mode.
+READ_CACHE_TTL = 2.0
+READ_CACHE_MAX = 512
+_READ_CACHE: Dict[tuple, tuple[int, float, bytes]] = {}
+_READ_CACHE_ENABLED = True
+_CATALOG_VERSION = 0
+
+
+def _bump_catalog() -> None:
+    global _CATALOG_VERSION
+    _CATALOG_VERSION += 1
+
+
+def _read_cache_key(req: Any, codec: int) -> Optional[tuple]:
+    if not _READ_CACHE_ENABLED or not isinstance(req, dict):
+        return None
+    collection = req.get("collection")
+    action = req.get("action")
+    data = req.get("data") or {}
+    if not isinstance(data, dict):
+        return None
+    if collection == "Game" and action == "list_public":
+        arg = None
+    elif collection == "Game" and action == "list_by_dev":
+        arg = data.get("developerId")
+    elif collection == "GameVersion" and action in ("list_for_gameId", "latest_for_gameId"):
+        arg = data.get("gameId")
+    else:
+        return None
+    if not isinstance(arg, (str, int, type(None))):
+        return None
+    return (codec, collection, action, arg)
+
+
+def _read_cache_get(key: tuple) -> Optional[bytes]:
+    hit = _READ_CACHE.get(key)
+    if hit is None or hit[0] != _CATALOG_VERSION or hit[1] < time.monotonic():
+        return None
+    return hit[2]
+
+
+def _read_cache_put(key: tuple, version: int, frame: bytes) -> None:
+    """Cache frame under the catalog version read *before* the query ran.
+
+    The writer thread may bump the version while the read is in flight.
+    """
+    if len(_READ_CACHE) >= READ_CACHE_MAX:
+        _READ_CACHE.clear()
+    _READ_CACHE[key] = (version, time.monotonic() + READ_CACHE_TTL, frame)
+
+
 def _fetchone_dict(cur: sqlite3.Cursor) -> Optional[dict]:
     row = cur.fetchone()
     return dict(row) if row else None
 
 
+def _tuple_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
+
+
+def _rows_as_objs(cur: sqlite3.Cursor) -> list[dict]:
+    """Row dicts built from plain tuples (cursor without sqlite3.Row) and one column list."""
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+
+def _table(cur: sqlite3.Cursor) -> Dict[str, Any]:
+    """Result set as {"cols": [...], "rows": [[...], ...]}; no per-row dicts (see db_rpc.table_rows)."""
+    return {"cols": [d[0] for d in cur.description], "rows": cur.fetchall()}
+
+
 # -------------------------
 # Collections
 # -------------------------
-def handle_dev_user(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_dev_user(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
     username = (data.get("username") or "").strip()
     password = data.get("password") or ""
     if action == "register":
         if not username or not password:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT 1 FROM DevUser WHERE username=?", (username,))
-            if cur.fetchone():
+            if conn.execute(_SQL["dev_exists"], (username,)).fetchone():
                 return _err("username_exists")
-            salt = _gen_salt()
-            pw_hash = _pbkdf2_hash(password, salt)
-            ts = now_ts()
-            cur.execute(
+        # No connection is held while the hash is derived in the worker pool.
+        salt = _gen_salt()
+        pw_hash = await _hash_password(password, salt)
+        ts = now_ts()
+        try:
+            new_id = await _run_write(_exec_write, (
                 "INSERT INTO DevUser(username,pw_salt,pw_hash,createdAt,lastLoginAt) VALUES(?,?,?,?,?)",
                 (username, salt, pw_hash, ts, 0),
-            )
-            conn.commit()
-            return _ok(data={"developerId": cur.lastrowid, "username": username})
+            ))
+        except sqlite3.IntegrityError:
+            return _err("username_exists")
+        return _ok(data={"developerId": new_id, "username": username})
 
     if action == "login":
         if not username or not password:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT id,pw_salt,pw_hash FROM DevUser WHERE username=?", (username,))
-            row = cur.fetchone()
-            if not row:
-                return _err("bad_credentials")
-            if not _verify_password(password, row["pw_salt"], row["pw_hash"]):
-                return _err("bad_credentials")
-            ts = now_ts()
-            cur.execute("UPDATE DevUser SET lastLoginAt=? WHERE id=?", (ts, row["id"]))
-            conn.commit()
-            return _ok(data={"developerId": int(row["id"]), "username": username})
+            row = conn.execute(_SQL["dev_auth"], (username,)).fetchone()
+        if not row:
+            return _err("bad_credentials")
+        ok, upgraded = await _verify_password(password, row["pw_salt"], row["pw_hash"])
+        if not ok:
+            return _err("bad_credentials")
+        ts = now_ts()
+        stmts = [(_SQL["dev_touch_login"], (ts, row["id"]))]
+        if upgraded is not None:
+            stmts.append((_SQL["dev_set_hash"], (upgraded, row["id"])))
+        await _run_write(_exec_write, *stmts)
+        return _ok(data={"developerId": int(row["id"]), "username": username})
 
     if action == "get_by_username":
         if not username:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,username,createdAt,lastLoginAt FROM DevUser WHERE username=?", (username,))
+            cur.execute(_SQL["dev_by_username"], (username,))
             row = _fetchone_dict(cur)
             if not row:
                 return _err("not_found")
@@ -275,58 +766,84 @@ def handle_dev_user(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,username,createdAt,lastLoginAt FROM DevUser WHERE id=?", (dev_id,))
+            cur.execute(_SQL["dev_by_id"], (dev_id,))
             row = _fetchone_dict(cur)
             if not row:
                 return _err("not_found")
             return _ok(data=row)
 
+    if action == "get_by_ids":
+        # Batched get_by_id: a {"cols", "rows"} table of the developers that exist.
+        # Ids that are not positive integers match no developer: skip them.
+        wanted = set()
+        for d in data.get("developerIds") or []:
+            try:
+                dev_id = int(d)
+            except (TypeError, ValueError):
+                continue
+            if dev_id > 0:
+                wanted.add(dev_id)
+        dev_ids = sorted(wanted)
+        rows: list = []
+        with _get_conn() as conn:
+            cur = conn.cursor()
+            for i in range(0, len(dev_ids), LATEST_BATCH):
+                batch = dev_ids[i:i + LATEST_BATCH]
+                cur.execute(
+                    f"SELECT id,username FROM DevUser WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                rows.extend(cur.fetchall())
+        return _ok(data={"cols": ["id", "username"], "rows": [list(r) for r in rows]})
+
     return _err("unknown_action")
 
 
-def handle_player_user(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_player_user(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
     username = (data.get("username") or "").strip()
     password = data.get("password") or ""
     if action == "register":
         if not username or not password:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT 1 FROM PlayerUser WHERE username=?", (username,))
-            if cur.fetchone():
+            if conn.execute(_SQL["player_exists"], (username,)).fetchone():
                 return _err("username_exists")
-            salt = _gen_salt()
-            pw_hash = _pbkdf2_hash(password, salt)
-            ts = now_ts()
-            cur.execute(
+        # No connection is held while the hash is derived in the worker pool.
+        salt = _gen_salt()
+        pw_hash = await _hash_password(password, salt)
+        ts = now_ts()
+        try:
+            new_id = await _run_write(_exec_write, (
                 "INSERT INTO PlayerUser(username,pw_salt,pw_hash,createdAt,lastLoginAt) VALUES(?,?,?,?,?)",
                 (username, salt, pw_hash, ts, 0),
-            )
-            conn.commit()
-            return _ok(data={"playerId": cur.lastrowid, "username": username})
+            ))
+        except sqlite3.IntegrityError:
+            return _err("username_exists")
+        return _ok(data={"playerId": new_id, "username": username})
 
     if action == "login":
         if not username or not password:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT id,pw_salt,pw_hash FROM PlayerUser WHERE username=?", (username,))
-            row = cur.fetchone()
-            if not row:
-                return _err("bad_credentials")
-            if not _verify_password(password, row["pw_salt"], row["pw_hash"]):
-                return _err("bad_credentials")
-            ts = now_ts()
-            cur.execute("UPDATE PlayerUser SET lastLoginAt=? WHERE id=?", (ts, row["id"]))
-            conn.commit()
-            return _ok(data={"playerId": int(row["id"]), "username": username})
+            row = conn.execute(_SQL["player_auth"], (username,)).fetchone()
+        if not row:
+            return _err("bad_credentials")
+        ok, upgraded = await _verify_password(password, row["pw_salt"], row["pw_hash"])
+        if not ok:
+            return _err("bad_credentials")
+        ts = now_ts()
+        stmts = [(_SQL["player_touch_login"], (ts, row["id"]))]
+        if upgraded is not None:
+            stmts.append((_SQL["player_set_hash"], (upgraded, row["id"])))
+        await _run_write(_exec_write, *stmts)
+        return _ok(data={"playerId": int(row["id"]), "username": username})
 
     if action == "get_by_username":
         if not username:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,username,createdAt,lastLoginAt FROM PlayerUser WHERE username=?", (username,))
+            cur.execute(_SQL["player_by_username"], (username,))
             row = _fetchone_dict(cur)
             if not row:
                 return _err("not_found")
@@ -354,6 +871,7 @@ def handle_game(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                 conn.commit()
             except sqlite3.IntegrityError:
                 return _err("game_exists")
+            _bump_catalog()
             return _ok(data={"gameDbId": cur.lastrowid})
 
     if action == "get_by_gameId":
@@ -362,7 +880,7 @@ def handle_game(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_by_gameId"], (game_id,))
             row = _fetchone_dict(cur)
             if not row:
                 return _err("not_found")
@@ -370,18 +888,18 @@ def handle_game(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
 
     if action == "list_public":
         with _get_conn() as conn:
-            cur = conn.cursor()
+            cur = _tuple_cursor(conn)
             cur.execute("SELECT * FROM Game WHERE delisted=0 ORDER BY updatedAt DESC, id DESC")
-            return _ok(games=[dict(r) for r in cur.fetchall()])
+            return _ok(games=_table(cur))
 
     if action == "list_by_dev":
         developer_id = int(data.get("developerId") or 0)
         if developer_id <= 0:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
+            cur = _tuple_cursor(conn)
             cur.execute("SELECT * FROM Game WHERE developerId=? ORDER BY updatedAt DESC, id DESC", (developer_id,))
-            return _ok(games=[dict(r) for r in cur.fetchall()])
+            return _ok(games=_table(cur))
 
     if action == "set_delisted":
         game_id = (data.get("gameId") or "").strip()
@@ -391,7 +909,7 @@ def handle_game(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT developerId FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_owner"], (game_id,))
             row = cur.fetchone()
             if not row:
                 return _err("not_found")
@@ -400,11 +918,27 @@ def handle_game(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             ts = now_ts()
             cur.execute("UPDATE Game SET delisted=?, updatedAt=? WHERE gameId=?", (delisted, ts, game_id))
             conn.commit()
+            _bump_catalog()
             return _ok()
 
     return _err("unknown_action")
 
 
+# Ids per IN (...) list in the batched lookups (latest_for_gameIds, DevUser get_by_ids).
+LATEST_BATCH = 500
+
+
+def _version_or_err(row: Optional[dict], missing: str) -> Dict[str, Any]:
+    """Reply for a `gv.*, g.delisted AS _delisted` row from a Game LEFT JOIN GameVersion."""
+    if not row:
+        return _err("not_found")
+    if row.pop("_delisted"):
+        return _err("game_delisted")
+    if row.get("id") is None:
+        return _err(missing)
+    return _ok(data=row)
+
+
 def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
     if action == "create":
         game_db_id = int(data.get("gameDbId") or 0)
@@ -458,6 +992,7 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                 conn.commit()
             except sqlite3.IntegrityError:
                 return _err("version_exists")
+            _bump_catalog()
             return _ok(data={"gameVersionId": cur.lastrowid})
 
     if action == "list_for_gameId":
@@ -466,11 +1001,12 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,delisted FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_pk_delisted"], (game_id,))
             g = cur.fetchone()
             if not g:
                 return _err("not_found")
             game_fk = int(g["id"])
+            cur = _tuple_cursor(conn)
             cur.execute(
                 """
                 SELECT id,version,uploadedAt,changelog,fileName,sizeBytes,sha256,clientType,minPlayers,maxPlayers
@@ -480,7 +1016,7 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                 """,
                 (game_fk,),
             )
-            return _ok(versions=[dict(r) for r in cur.fetchall()])
+            return _ok(versions=_table(cur))
 
     if action == "get_for_gameId_version":
         game_id = (data.get("gameId") or "").strip()
@@ -489,24 +1025,8 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,delisted FROM Game WHERE gameId=?", (game_id,))
-            g = cur.fetchone()
-            if not g:
-                return _err("not_found")
-            if int(g["delisted"]) != 0:
-                return _err("game_delisted")
-            cur.execute(
-                """
-                SELECT gv.* FROM GameVersion gv
-                WHERE gv.gameFk=? AND gv.version=?
-                LIMIT 1
-                """,
-                (int(g["id"]), version),
-            )
-            row = _fetchone_dict(cur)
-            if not row:
-                return _err("no_such_version")
-            return _ok(data=row)
+            cur.execute(_SQL["version_for_gameId"], (version, game_id))
+            return _version_or_err(_fetchone_dict(cur), "no_such_version")
 
     if action == "latest_for_gameId":
         game_id = (data.get("gameId") or "").strip()
@@ -514,25 +1034,37 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id,delisted FROM Game WHERE gameId=?", (game_id,))
-            g = cur.fetchone()
-            if not g:
-                return _err("not_found")
-            if int(g["delisted"]) != 0:
-                return _err("game_delisted")
-            cur.execute(
-                """
-                SELECT gv.* FROM GameVersion gv
-                WHERE gv.gameFk=?
-                ORDER BY gv.uploadedAt DESC, gv.id DESC
-                LIMIT 1
-                """,
-                (int(g["id"]),),
-            )
-            row = _fetchone_dict(cur)
-            if not row:
-                return _err("no_version")
-            return _ok(data=row)
+            cur.execute(_SQL["latest_for_gameId"], (game_id,))
+            return _version_or_err(_fetchone_dict(cur), "no_version")
+
+    if action == "latest_for_gameIds":
+        # Batched latest_for_gameId: {gameId: version} for listed, versioned games.
+        game_ids = [str(g) for g in (data.get("gameIds") or []) if g]
+        if not game_ids:
+            return _ok(data={})
+        out: Dict[str, Any] = {}
+        with _get_conn() as conn:
+            cur = conn.cursor()
+            for i in range(0, len(game_ids), LATEST_BATCH):
+                batch = game_ids[i:i + LATEST_BATCH]
+                cur.execute(
+                    f"""
+                    SELECT gameId,id,version,uploadedAt,sizeBytes,sha256,clientType,minPlayers,maxPlayers
+                    FROM (
+                        SELECT g.gameId, gv.*,
+                               ROW_NUMBER() OVER (PARTITION BY gv.gameFk ORDER BY gv.uploadedAt DESC, gv.id DESC) AS rn
+                        FROM Game g
+                        JOIN GameVersion gv ON gv.gameFk=g.id
+                        WHERE g.gameId IN ({",".join("?" * len(batch))}) AND g.delisted=0
+                    )
+                    WHERE rn=1
+                    """,
+                    batch,
+                )
+                for row in cur:
+                    v = dict(row)
+                    out[v.pop("gameId")] = v
+        return _ok(data=out)
 
     if action == "get_by_id":
         vid = int(data.get("gameVersionId") or 0)
@@ -540,7 +1072,7 @@ def handle_game_version(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM GameVersion WHERE id=?", (vid,))
+            cur.execute(_SQL["version_by_id"], (vid,))
             row = _fetchone_dict(cur)
             if not row:
                 return _err("not_found")
@@ -559,7 +1091,7 @@ def handle_review(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("bad_request")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_pk"], (game_id,))
             g = cur.fetchone()
             if not g:
                 return _err("not_found")
@@ -584,10 +1116,11 @@ def handle_review(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_pk"], (game_id,))
             g = cur.fetchone()
             if not g:
                 return _err("not_found")
+            cur = _tuple_cursor(conn)
             cur.execute(
                 """
                 SELECT playerId,rating,comment,createdAt,updatedAt
@@ -597,8 +1130,7 @@ def handle_review(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                 """,
                 (int(g["id"]),),
             )
-            rows = [dict(r) for r in cur.fetchall()]
-            return _ok(reviews=rows)
+            return _ok(reviews=_rows_as_objs(cur))
 
     return _err("unknown_action")
 
@@ -611,19 +1143,18 @@ def handle_room(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         if host_player_id <= 0 or game_db_id <= 0 or game_version_id <= 0:
             return _err("missing_fields")
         ts = now_ts()
-        with _get_conn() as conn:
+        with _get_conn() as conn, conn:
             cur = conn.cursor()
             cur.execute(
                 "INSERT INTO Room(hostPlayerId,gameFk,gameVersionFk,status,createdAt,updatedAt) VALUES(?,?,?,?,?,?)",
                 (host_player_id, game_db_id, game_version_id, "waiting", ts, ts),
             )
             rid = cur.lastrowid
-            cur.execute(
+            cur.executemany(
                 "INSERT OR IGNORE INTO RoomMember(roomId,playerId,joinedAt) VALUES(?,?,?)",
-                (rid, host_player_id, ts),
+                [(rid, host_player_id, ts)],
             )
-            conn.commit()
-            return _ok(data={"roomId": rid})
+        return _ok(data={"roomId": rid})
 
     if action == "has_playing_for_gameId":
         game_id = (data.get("gameId") or "").strip()
@@ -645,7 +1176,7 @@ def handle_room(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
 
     if action == "list":
         with _get_conn() as conn:
-            cur = conn.cursor()
+            cur = _tuple_cursor(conn)
             cur.execute(
                 """
                 SELECT r.id,r.hostPlayerId,r.status,r.createdAt,r.updatedAt,
@@ -657,10 +1188,14 @@ def handle_room(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                 ORDER BY r.updatedAt DESC, r.id DESC
                 """
             )
-            rooms = [dict(r) for r in cur.fetchall()]
-            for room in rooms:
-                cur.execute("SELECT playerId FROM RoomMember WHERE roomId=? ORDER BY joinedAt ASC", (int(room["id"]),))
-                room["players"] = [int(x["playerId"]) for x in cur.fetchall()]
+            rooms = _table(cur)
+            # Every room is listed, so one ordered scan of RoomMember (served by
+            # idx_roommember_room_joined) fills all member lists.
+            members: DefaultDict[int, list[int]] = defaultdict(list)
+            for room_id, player_id in conn.execute(_SQL["all_room_members"]):
+                members[room_id].append(player_id)
+            rooms["cols"].append("players")
+            rooms["rows"] = [(*row, members.get(row[0], [])) for row in rooms["rows"]]
             return _ok(rooms=rooms)
 
     if action == "get":
@@ -685,8 +1220,10 @@ def handle_room(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             room = _fetchone_dict(cur)
             if not room:
                 return _err("not_found")
-            cur.execute("SELECT playerId FROM RoomMember WHERE roomId=? ORDER BY joinedAt ASC", (room_id,))
-            room["players"] = [int(x["playerId"]) for x in cur.fetchall()]
+            # playerId is an INTEGER column, so SQLite already hands back ints
+            cur = _tuple_cursor(conn)
+            cur.execute(_SQL["room_members"], (room_id,))
+            room["players"] = [pid for (pid,) in cur.fetchall()]
             return _ok(data=room)
 
     if action == "add_member":
@@ -695,28 +1232,23 @@ def handle_room(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         if room_id <= 0 or player_id <= 0:
             return _err("missing_fields")
         ts = now_ts()
-        with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
+        # Room.updatedAt is bumped by trg_rm_bump
+        with _get_conn() as conn, conn:
+            conn.execute(
                 "INSERT OR IGNORE INTO RoomMember(roomId,playerId,joinedAt) VALUES(?,?,?)",
                 (room_id, player_id, ts),
             )
-            cur.execute("UPDATE Room SET updatedAt=? WHERE id=?", (ts, room_id))
-            conn.commit()
-            return _ok()
+        return _ok()
 
     if action == "remove_member":
         room_id = int(data.get("roomId") or 0)
         player_id = int(data.get("playerId") or 0)
         if room_id <= 0 or player_id <= 0:
             return _err("missing_fields")
-        ts = now_ts()
-        with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM RoomMember WHERE roomId=? AND playerId=?", (room_id, player_id))
-            cur.execute("UPDATE Room SET updatedAt=? WHERE id=?", (ts, room_id))
-            conn.commit()
-            return _ok()
+        # Room.updatedAt is bumped by trg_rm_unbump
+        with _get_conn() as conn, conn:
+            conn.execute("DELETE FROM RoomMember WHERE roomId=? AND playerId=?", (room_id, player_id))
+        return _ok()
 
     if action == "set_status":
         room_id = int(data.get("roomId") or 0)
@@ -764,7 +1296,8 @@ def handle_match_log(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         required = ("roomId", "gameDbId", "gameVersionId", "startedAt", "endedAt", "reason", "resultsJson")
         if any(k not in data for k in required):
             return _err("missing_fields", missing=[k for k in required if k not in data])
-        with _get_conn() as conn:
+        # MatchLog row and its MatchPlayer rows (trg_ml_ins) commit together.
+        with _get_conn() as conn, conn:
             cur = conn.cursor()
             cur.execute(
                 """
@@ -782,8 +1315,13 @@ def handle_match_log(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
                     str(data["resultsJson"]),
                 ),
             )
-            conn.commit()
-            return _ok(data={"matchLogId": cur.lastrowid})
+            if not _HAS_JSON1:
+                match_id = cur.lastrowid
+                cur.executemany(
+                    _SQL["match_player_ins"],
+                    [(match_id, pid) for pid in _match_player_ids(str(data["resultsJson"]))],
+                )
+        return _ok(data={"matchLogId": cur.lastrowid})
 
     if action == "has_player_played":
         game_id = (data.get("gameId") or "").strip()
@@ -792,20 +1330,19 @@ def handle_match_log(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
             return _err("missing_fields")
         with _get_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM Game WHERE gameId=?", (game_id,))
+            cur.execute(_SQL["game_pk"], (game_id,))
             g = cur.fetchone()
             if not g:
                 return _err("not_found")
             game_fk = int(g["id"])
-            # Minimal eligibility check: does any match log contain this playerId marker?
-            # (Lobby persists resultsJson with at least a players list.)
             cur.execute(
                 """
-                SELECT 1 FROM MatchLog
-                WHERE gameFk=? AND resultsJson LIKE ?
+                SELECT 1 FROM MatchPlayer mp
+                JOIN MatchLog ml ON ml.id=mp.matchFk
+                WHERE ml.gameFk=? AND mp.playerId=?
                 LIMIT 1
                 """,
-                (game_fk, f"%\"userId\": {player_id}%"),
+                (game_fk, player_id),
             )
             played = cur.fetchone() is not None
             return _ok(data={"played": played})
@@ -815,27 +1352,29 @@ def handle_match_log(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         if player_id <= 0:
             return _err("missing_fields")
         with _get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT ml.*,
-                       g.gameId AS gameId,
-                       gv.version AS version
-                FROM MatchLog ml
-                JOIN Game g ON g.id=ml.gameFk
-                JOIN GameVersion gv ON gv.id=ml.gameVersionFk
-                WHERE resultsJson LIKE ?
-                ORDER BY ml.endedAt DESC, ml.id DESC
-                LIMIT 50
-                """,
-                (f"%\"userId\": {player_id}%",),
-            )
-            return _ok(logs=[dict(r) for r in cur.fetchall()])
+            cur = _tuple_cursor(conn)
+            cur.execute(_SQL["match_logs_for_player"], (player_id,))
+            return _ok(logs=_rows_as_objs(cur))
 
     return _err("unknown_action")
 
 
-def dispatch(req: Dict[str, Any]) -> Dict[str, Any]:
+# Actions that modify the database; they run on the writer thread.
+_WRITE_ACTIONS = {
+    "Game": frozenset({"create", "set_delisted"}),
+    "GameVersion": frozenset({"create"}),
+    "Review": frozenset({"upsert"}),
+    "Room": frozenset({"create", "add_member", "remove_member", "set_status", "set_host", "delete_if_empty"}),
+    "MatchLog": frozenset({"create"}),
+}
+
+
+def dispatch(req: Dict[str, Any]) -> Union[Dict[str, Any], Awaitable[Dict[str, Any]]]:
+    """Route a request.
+
+    Reads are answered inline. Writes return a future from the writer thread, and
+    auth collections return a coroutine (password hashing is offloaded).
+    """
     collection = req.get("collection")
     action = req.get("action")
     data = req.get("data", {}) or {}
@@ -844,6 +1383,12 @@ def dispatch(req: Dict[str, Any]) -> Dict[str, Any]:
         return handle_dev_user(action, data)
     if collection == "PlayerUser":
         return handle_player_user(action, data)
+    if action in _WRITE_ACTIONS.get(collection, ()):
+        return _run_write(_dispatch_sync, collection, action, data)
+    return _dispatch_sync(collection, action, data)
+
+
+def _dispatch_sync(collection: Any, action: Any, data: Dict[str, Any]) -> Dict[str, Any]:
     if collection == "Game":
         return handle_game(action, data)
     if collection == "GameVersion":
@@ -857,33 +1402,211 @@ def dispatch(req: Dict[str, Any]) -> Dict[str, Any]:
     return _err("unknown_collection")
 
 
-async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-    try:
-        while True:
-            frame = await recv_frame(reader)
-            if frame is None:
+RECV_COMPACT_AT = 64 * 1024
+
+
+class DbProtocol(asyncio.Protocol):
+    """One DB client connection: peel frames from the buffer and reply in request order.
+
+    Reads are answered straight from data_received(); writes (writer thread) and
+    auth handlers (coroutines) finish later, so replies queue behind them.
+    """
+
+    def __init__(self) -> None:
+        self.transport: Optional[asyncio.Transport] = None
+        self.buf = bytearray()
+        self.off = 0  # start of unparsed bytes in buf
+        self.codec = CODEC_JSON
+        self.replies: Deque[list] = deque()  # [frame-or-None] slots, oldest first
+        self.out: list[bytes] = []  # encoded replies waiting for one writelines()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        set_low_latency(transport.get_extra_info("socket"))
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        self.replies.clear()
+        self.out.clear()
+
+    # Stop reading while the peer is not draining our replies.
+    def pause_writing(self) -> None:
+        if self.transport is not None:
+            self.transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        if self.transport is not None:
+            self.transport.resume_reading()
+
+    def data_received(self, data: bytes) -> None:
+        buf = self.buf
+        buf += data
+        off = self.off
+        size = len(buf)
+        while size - off >= HDR.size:
+            (length,) = HDR.unpack_from(buf, off)
+            if length == 0 or length > MAX_FRAME:
+                self._abort()
+                return
+            end = off + HDR.size + length
+            if size < end:
                 break
-            try:
-                req = json.loads(frame.decode("utf-8"))
-                resp = dispatch(req)
-            except Exception:
-                resp = _err("exception")
-            await send_frame(writer, json.dumps(resp, separators=(",", ":")).encode("utf-8"))
-    except FramingError:
-        pass
+            with memoryview(buf) as mv:
+                frame = bytes(mv[off + HDR.size:end])
+            off = end
+            self._on_frame(frame)
+            if self.transport is None:
+                return
+        # Parsed bytes are dropped lazily so a burst of small frames is not
+        # an O(n) memmove per frame.
+        if off == size:
+            buf.clear()
+            off = 0
+        elif off >= RECV_COMPACT_AT:
+            del buf[:off]
+            off = 0
+        self.off = off
+        self._send_pending()
+
+    def _on_frame(self, frame: bytes) -> None:
+        if len(frame) == 1:
+            # Codec hello (see db_rpc); answer with the codec we will speak.
+            self.codec = frame[0] if codec_supported(frame[0]) else CODEC_JSON
+            self._reply(HDR.pack(1) + bytes([self.codec]))
+            return
+        codec = self.codec
+        cache_key = None
+        version = _CATALOG_VERSION
+        try:
+            req = decode_payload(frame, codec)
+            cache_key = _read_cache_key(req, codec)
+            if cache_key is not None:
+                cached = _read_cache_get(cache_key)
+                if cached is not None:
+                    self._reply(cached)
+                    return
+            resp = dispatch(req)
+        except Exception:
+            resp = _err("exception")
+        if isinstance(resp, dict):
+            out = self._encode(resp, codec)
+            if cache_key is not None and out and resp.get("status") == "OK":
+                _read_cache_put(cache_key, version, out)
+            self._reply(out)
+            return
+        slot: list = [None]
+        self.replies.append(slot)
+        task = asyncio.ensure_future(resp)
+        task.add_done_callback(lambda t: self._finish(slot, t, codec))
+
+    def _finish(self, slot: list, task: "asyncio.Future[Dict[str, Any]]", codec: int) -> None:
+        try:
+            resp = task.result()
+        except Exception:
+            resp = _err("exception")
+        slot[0] = self._encode(resp, codec)
+        self._flush()
+        self._send_pending()
+
+    def _encode(self, resp: Dict[str, Any], codec: int) -> bytes:
+        """Encoded reply frame, or b"" if the reply is too large to frame."""
+        try:
+            return _prebuilt_frame(resp, codec) or encode_frame(resp, codec)
+        except FramingError:
+            return b""
+
+    def _reply(self, frame: bytes) -> None:
+        if self.replies:
+            self.replies.append([frame])
+            self._flush()
+        else:
+            self.out.append(frame)
+
+    def _flush(self) -> None:
+        while self.replies and self.replies[0][0] is not None:
+            self.out.append(self.replies.popleft()[0])
+
+    def _send_pending(self) -> None:
+        out = self.out
+        if not out or self.transport is None:
+            out.clear()
+            return
+        if not all(out):  # reply too large to frame: drop the connection like before
+            self._abort()
+            return
+        self.out = []
+        if len(out) == 1:
+            self.transport.write(out[0])
+        else:
+            self.transport.writelines(out)
+
+    def _abort(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.replies.clear()
+        self.out.clear()
+
+
+async def main(*, reuse_port: bool = False):
+    if not reuse_port:
+        init_db()  # workers: _serve_workers() did it before forking
+    # Started here, not in init_db(): a thread running at fork() time would
+    # leave the workers' SQLite mutexes locked.
+    _WRITER.start()
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(DbProtocol, HOST, PORT, reuse_port=reuse_port)
+    print(f"[DB] SQLite at {DB_PATH} | listen {HOST}:{PORT}")
+    stop = loop.create_future()
+    with contextlib.suppress(NotImplementedError, RuntimeError):
+        # SIGTERM must unwind through the finally below, or the hash workers outlive us.
+        loop.add_signal_handler(signal.SIGTERM, lambda: stop.done() or stop.set_result(None))
+    try:
+        async with server:
+            await stop
     finally:
-        writer.close()
-        with contextlib.suppress(Exception):
-            await writer.wait_closed()
+        _POOL.close_all()
+        _shutdown_hash_pool()
 
 
-async def main():
+def _serve_workers(n: int) -> None:
+    """Fork n servers on one SO_REUSEPORT port; SIGTERM/SIGINT are passed on to them."""
+    global _READ_CACHE_ENABLED
+    _READ_CACHE_ENABLED = False  # a sibling's writes would not invalidate it
     init_db()
-    server = await asyncio.start_server(handle, HOST, PORT)
-    print(f"[DB] SQLite at {DB_PATH} | listen {HOST}:{PORT}")
-    async with server:
-        await server.serve_forever()
+    _POOL.close_all()  # SQLite connections must not cross fork()
+    pids = []
+    for _ in range(n):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor sends SIGTERM
+            code = 0
+            try:
+                run_event_loop(main(reuse_port=True))
+            except (SystemExit, KeyboardInterrupt):
+                code = 1
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        pids.append(pid)
+    print(f"[DB] {n} workers: {pids}")
+
+    def _forward(signum: int, _frame: Any) -> None:
+        for pid in pids:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for pid in pids:
+        with contextlib.suppress(ChildProcessError):
+            os.waitpid(pid, 0)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if WORKERS > 1 and hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT"):
+        _serve_workers(WORKERS)
+    else:
+        run_event_loop(main())
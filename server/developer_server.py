@@ -17,20 +17,23 @@ import asyncio
 import base64
 import contextlib
 import hashlib
-import json
 import os
 import re
 import secrets
 import shutil
+import ssl
+import string
+import time
 import zipfile
 from dataclasses import dataclass, field
-from pathlib import Path
-from typing import Dict, Optional
+from pathlib import Path, PureWindowsPath
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
-from hw3.common.framing import FramingError, recv_frame, send_frame
+from hw3.common.framing import MAX_FRAME, FramingError, json_dumps, json_loads, recv_frame, send_frame, set_low_latency
 from hw3.common.manifest import load_manifest_from_dir
 from hw3.common.config import get_int, get_str, resolve_path, section
-from hw3.server.db_rpc import db_call
+from hw3.server.db_rpc import DB_POOL, db_call, run_event_loop, table_rows
 
 
 _CFG_DEV = section("developerServer")
@@ -51,6 +54,20 @@ if not UPLOAD_ROOT.is_absolute():
 if not TMP_ROOT.is_absolute():
     TMP_ROOT = resolve_path(str(TMP_ROOT))
 
+# Upload chunk size advertised to clients: one full frame, so each hasher.update()
+# sees a buffer large enough for OpenSSL's SHA-256 (SHA-NI where available).
+UPLOAD_CHUNK_SIZE = MAX_FRAME
+# Upper bound for the client-requested ackEvery (chunks in flight before an ack).
+UPLOAD_ACK_EVERY_MAX = 64
+# Uploads idle for longer than this are abandoned by the reaper task.
+UPLOAD_IDLE_TTL = int(os.environ.get("NP_HW3_UPLOAD_TTL") or get_int(_CFG_DEV, "uploadTtlSeconds") or 3600)
+UPLOAD_REAP_INTERVAL = 60
+# Transport write buffer watermarks for client connections (see handle()).
+WRITE_HIGH_WATER = 64 * 1024
+WRITE_LOW_WATER = 16 * 1024
+if "sha256" not in hashlib.algorithms_guaranteed:
+    raise RuntimeError("hashlib has no guaranteed sha256")
+
 
 def _ok(**kwargs):
     return {"ok": True, **kwargs}
@@ -61,17 +78,47 @@ def _err(msg: str, **kwargs):
 
 
 async def _send(writer: asyncio.StreamWriter, obj: dict):
-    await send_frame(writer, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+    await send_frame(writer, json_dumps(obj))
+
+
+async def _send_bytes(writer: asyncio.StreamWriter, payload: bytes):
+    """Send an already-serialized reply (see the _OK_* / _ERR_* constants)."""
+    await send_frame(writer, payload)
+
+
+# Fixed replies, serialized once.
+_OK_EMPTY = json_dumps(_ok())
+_OK_LOGGED_OUT = json_dumps(_ok(loggedOut=True))
+_ERR_NOT_LOGGED_IN = json_dumps(_err("not_logged_in"))
+_ERR_NO_SUCH_UPLOAD = json_dumps(_err("no_such_upload"))
+
+
+class _SlugTable(dict):
+    """str.translate table: [a-z0-9] map to themselves, anything else to "_".
+
+    The ASCII range is built up front; other code points get "_" without being
+    stored, so names full of distinct characters cannot grow the table.
+    """
 
-_SLUG_RE = re.compile(r"[^a-z0-9]+")
+    def __init__(self) -> None:
+        super().__init__(
+            (code, chr(code) if chr(code) in string.ascii_lowercase + string.digits else "_") for code in range(128)
+        )
+
+    def __missing__(self, code: int) -> str:
+        return "_"
+
+
+_SLUG_TABLE = _SlugTable()
 _GAME_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 _VERSION_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
 
 
 def _slugify(name: str) -> str:
-    s = (name or "").strip().lower()
-    s = _SLUG_RE.sub("_", s).strip("_")
-    return s[:32] if s else ""
+    s = (name or "").strip().lower().translate(_SLUG_TABLE)
+    # Collapse runs of "_" and trim them from both ends.
+    s = "_".join(filter(None, s.split("_")))
+    return s[:32]
 
 
 async def _reserve_unique_game_id(base: str, developer_id: int) -> str:
@@ -94,13 +141,18 @@ def _safe_extract_zip(zip_path: Path, dst_dir: Path) -> None:
     Extract zip into dst_dir while preventing Zip Slip.
     """
     dst_dir.mkdir(parents=True, exist_ok=True)
+    root = dst_dir.resolve()
     with zipfile.ZipFile(zip_path, "r") as zf:
+        # One pass: validate each member, then extract it.
         for member in zf.infolist():
-            # Reject absolute paths and parent traversal.
-            member_path = Path(member.filename)
-            if member_path.is_absolute() or ".." in member_path.parts:
+            # Reject absolute paths (incl. Windows drives) and parent traversal.
+            member_path = PureWindowsPath(member.filename)
+            if member_path.drive or member_path.root or ".." in member_path.parts:
+                raise ValueError("unsafe_zip_entry")
+            target = (root / member.filename).resolve()
+            if target != root and root not in target.parents:
                 raise ValueError("unsafe_zip_entry")
-        zf.extractall(dst_dir)
+            zf.extract(member, root)
 
 
 @dataclass
@@ -123,19 +175,61 @@ class UploadSession:
     received: int = 0
     next_seq: int = 0
     hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    fd: int = -1  # temp file, open for the whole upload
+    anonymous: bool = False  # fd is an O_TMPFILE inode; temp_path does not exist
+    ack_every: int = 1  # ack one in every N successful chunks
+    last_active: float = field(default_factory=time.monotonic)
 
 
-SESSIONS: Dict[asyncio.StreamWriter, DevSession] = {}
+# The DevSession lives on its connection's writer (writer._dev_session);
+# ONLINE_DEVS is the reverse lookup.
 ONLINE_DEVS: Dict[int, asyncio.StreamWriter] = {}
 UPLOADS: Dict[str, UploadSession] = {}
 
 
 def _require_login(writer: asyncio.StreamWriter) -> Optional[DevSession]:
-    return SESSIONS.get(writer)
+    return getattr(writer, "_dev_session", None)
+
+
+def _pop_session(writer: asyncio.StreamWriter) -> Optional[DevSession]:
+    sess = getattr(writer, "_dev_session", None)
+    writer._dev_session = None  # type: ignore[attr-defined]
+    return sess
+
+
+def _close_upload_fd(up: UploadSession) -> None:
+    if up.fd >= 0:
+        with contextlib.suppress(OSError):
+            os.close(up.fd)
+        up.fd = -1
+
+
+def _discard_upload(upload_id: str, up: UploadSession) -> None:
+    UPLOADS.pop(upload_id, None)
+    _close_upload_fd(up)
+    with contextlib.suppress(OSError):
+        up.temp_path.unlink()
+
+
+def _drop_uploads(developer_id: int) -> None:
+    """Abandon a developer's unfinished uploads (their connection is gone)."""
+    for upload_id, up in list(UPLOADS.items()):
+        if up.developer_id == developer_id:
+            _discard_upload(upload_id, up)
+
+
+async def _upload_reaper() -> None:
+    """Periodically abandon uploads that have seen no chunk for UPLOAD_IDLE_TTL seconds."""
+    while True:
+        await asyncio.sleep(UPLOAD_REAP_INTERVAL)
+        cutoff = time.monotonic() - UPLOAD_IDLE_TTL
+        for upload_id, up in list(UPLOADS.items()):
+            if up.last_active < cutoff:
+                _discard_upload(upload_id, up)
 
 
 async def handle_register(writer: asyncio.StreamWriter, data: dict):
-    resp = await db_call({"collection": "DevUser", "action": "register", "data": data})
+    resp = await db_call({"collection": "DevUser", "action": "register", "data": data or {}})
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "register_failed")))
         return
@@ -143,7 +237,7 @@ async def handle_register(writer: asyncio.StreamWriter, data: dict):
 
 
 async def handle_login(writer: asyncio.StreamWriter, data: dict):
-    resp = await db_call({"collection": "DevUser", "action": "login", "data": data})
+    resp = await db_call({"collection": "DevUser", "action": "login", "data": data or {}})
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "login_failed")))
         return
@@ -156,35 +250,41 @@ async def handle_login(writer: asyncio.StreamWriter, data: dict):
     if dev_id in ONLINE_DEVS:
         await _send(writer, _err("already_online"))
         return
-    SESSIONS[writer] = DevSession(developer_id=dev_id, username=username)
+    writer._dev_session = DevSession(developer_id=dev_id, username=username)  # type: ignore[attr-defined]
     ONLINE_DEVS[dev_id] = writer
     await _send(writer, _ok(developerId=dev_id, username=username))
 
 
 async def handle_logout(writer: asyncio.StreamWriter):
-    sess = SESSIONS.pop(writer, None)
+    sess = _pop_session(writer)
     if sess:
         ONLINE_DEVS.pop(sess.developer_id, None)
-    await _send(writer, _ok(loggedOut=True))
+        _drop_uploads(sess.developer_id)
+    await _send_bytes(writer, _OK_LOGGED_OUT)
 
 
 async def handle_game_list_mine(writer: asyncio.StreamWriter):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     resp = await db_call({"collection": "Game", "action": "list_by_dev", "data": {"developerId": sess.developer_id}})
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "list_failed")))
         return
-    games = resp.get("games") or []
+    games = table_rows(resp.get("games"))
+    latest = await db_call(
+        {"collection": "GameVersion", "action": "latest_for_gameIds", "data": {"gameIds": [g.get("gameId") for g in games]}}
+    )
+    if latest.get("status") != "OK":
+        await _send(writer, _err(latest.get("error", "list_failed")))
+        return
+    versions = latest.get("data") or {}
     out = []
     for g in games:
-        gid = g.get("gameId")
-        latest = await db_call({"collection": "GameVersion", "action": "latest_for_gameId", "data": {"gameId": gid}})
         g2 = dict(g)
-        if latest.get("status") == "OK":
-            v = latest.get("data") or {}
+        v = versions.get(g.get("gameId"))
+        if v:
             g2["latestVersion"] = v.get("version")
             g2["clientType"] = v.get("clientType")
             g2["minPlayers"] = v.get("minPlayers")
@@ -198,7 +298,7 @@ async def handle_game_list_mine(writer: asyncio.StreamWriter):
 async def handle_game_delist(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     game_id = str((data.get("gameId") or "")).strip()
     delisted = bool(data.get("delisted"))
@@ -212,12 +312,12 @@ async def handle_game_delist(writer: asyncio.StreamWriter, data: dict):
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "delist_failed")))
         return
-    await _send(writer, _ok())
+    await _send_bytes(writer, _OK_EMPTY)
 
 async def handle_game_versions(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     game_id = str((data.get("gameId") or "")).strip()
     if not game_id:
@@ -235,13 +335,13 @@ async def handle_game_versions(writer: asyncio.StreamWriter, data: dict):
     if v.get("status") != "OK":
         await _send(writer, _err(v.get("error", "list_failed")))
         return
-    await _send(writer, _ok(gameId=game_id, versions=v.get("versions") or []))
+    await _send(writer, _ok(gameId=game_id, versions=table_rows(v.get("versions"))))
 
 
 async def handle_upload_init(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
 
     game_id = str((data.get("gameId") or "")).strip()
@@ -249,6 +349,7 @@ async def handle_upload_init(writer: asyncio.StreamWriter, data: dict):
     file_name = str((data.get("fileName") or "")).strip()
     expected_size = int(data.get("sizeBytes") or 0)
     expected_sha256 = str((data.get("sha256") or "")).strip().lower()
+    ack_every = min(max(int(data.get("ackEvery") or 1), 1), UPLOAD_ACK_EVERY_MAX)
 
     if not version or expected_size <= 0 or not expected_sha256:
         await _send(writer, _err("missing_fields"))
@@ -342,9 +443,13 @@ async def handle_upload_init(writer: asyncio.StreamWriter, data: dict):
                     await _send(writer, _err(created.get("error", "create_failed")))
                     return
 
+    if not file_name:
+        file_name = f"{game_id}-{version}.zip"
+
     upload_id = secrets.token_hex(16)
     TMP_ROOT.mkdir(parents=True, exist_ok=True)
     temp_path = TMP_ROOT / f"{upload_id}.zip.part"
+    fd, anonymous = _open_upload_file(temp_path)
 
     UPLOADS[upload_id] = UploadSession(
         upload_id=upload_id,
@@ -359,65 +464,145 @@ async def handle_upload_init(writer: asyncio.StreamWriter, data: dict):
         received=0,
         next_seq=0,
         hasher=hashlib.sha256(),
+        fd=fd,
+        anonymous=anonymous,
+        ack_every=ack_every,
     )
-    # Truncate/initialize temp file
-    temp_path.write_bytes(b"")
-    await _send(writer, _ok(uploadId=upload_id, gameId=game_id, created=auto_created))
+    await _send(
+        writer,
+        _ok(
+            uploadId=upload_id,
+            gameId=game_id,
+            created=auto_created,
+            recommendedChunkSize=UPLOAD_CHUNK_SIZE,
+            ackEvery=ack_every,
+        ),
+    )
+
+
+def _write_and_hash(up: UploadSession, chunk: bytes) -> None:
+    """Runs in a worker thread; hashlib releases the GIL for large buffers."""
+    view = memoryview(chunk)
+    while view:
+        view = view[os.write(up.fd, view):]
+    up.hasher.update(chunk)
+    up.received += len(chunk)
+
 
+def _open_upload_file(temp_path: Path) -> Tuple[int, bool]:
+    """Open the upload's temp file: an unnamed O_TMPFILE inode where supported, else temp_path.
+
+    O_RDWR so the inode can be sendfile()d out if it cannot be linked into place.
+    """
+    if hasattr(os, "O_TMPFILE"):
+        try:
+            return os.open(temp_path.parent, os.O_TMPFILE | os.O_RDWR, 0o600), True
+        except OSError:  # e.g. filesystem without O_TMPFILE support
+            pass
+    return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600), False
+
+
+def _link_tmpfile(fd: int, zip_path: Path) -> None:
+    """Give an O_TMPFILE inode its final name; copy with sendfile if UPLOAD_ROOT is another filesystem."""
+    os.fsync(fd)
+    with contextlib.suppress(FileNotFoundError):
+        zip_path.unlink()
+    try:
+        os.link(f"/proc/self/fd/{fd}", zip_path)
+        return
+    except OSError:
+        pass
+    size = os.fstat(fd).st_size
+    out = os.open(zip_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out, fd, offset, size - offset)
+            if not sent:
+                raise OSError("short sendfile")
+            offset += sent
+    finally:
+        os.close(out)
+
+
+def _install_package(up: UploadSession, zip_path: Path, extracted_path: Path) -> None:
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if up.anonymous:
+            _link_tmpfile(up.fd, zip_path)
+        else:
+            shutil.move(str(up.temp_path), str(zip_path))
+    finally:
+        _close_upload_fd(up)
+    if extracted_path.exists():
+        shutil.rmtree(extracted_path)
+    _safe_extract_zip(zip_path, extracted_path)
+
+
+async def handle_upload_chunk(writer: asyncio.StreamWriter, data: dict, raw: Optional[bytes] = None):
+    """Append one chunk: base64 in `dataB64`, or `raw` bytes from a game_upload_chunk_bin payload frame.
+
+    Successful chunks are acked every `ackEvery` chunks (and on the last one);
+    errors are always answered and carry the chunk's seq so a batching client
+    knows how many replies are still on the way.
+    """
+    seq = int(data.get("seq") or 0)
+
+    async def fail(msg: str, **kwargs):
+        await _send(writer, _err(msg, seq=seq, **kwargs))
 
-async def handle_upload_chunk(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await fail("not_logged_in")
         return
 
     upload_id = str((data.get("uploadId") or "")).strip()
-    seq = int(data.get("seq") or 0)
-    chunk_b64 = data.get("dataB64") or ""
-
     up = UPLOADS.get(upload_id)
     if not up:
-        await _send(writer, _err("no_such_upload"))
+        await fail("no_such_upload")
         return
     if up.developer_id != sess.developer_id:
-        await _send(writer, _err("not_owner"))
+        await fail("not_owner")
         return
     if seq != up.next_seq:
-        await _send(writer, _err("bad_seq", expected=up.next_seq))
+        await fail("bad_seq", expected=up.next_seq)
         return
 
-    try:
-        chunk = base64.b64decode(chunk_b64.encode("ascii"), validate=True)
-    except Exception:
-        await _send(writer, _err("bad_base64"))
-        return
+    if raw is not None:
+        chunk = raw
+    else:
+        # No validate=True: a corrupted chunk still fails the SHA-256 check at finish.
+        try:
+            chunk = base64.b64decode(data.get("dataB64") or "")
+        except Exception:
+            await fail("bad_base64")
+            return
 
     if not chunk:
-        await _send(writer, _err("empty_chunk"))
+        await fail("empty_chunk")
         return
 
     if up.received + len(chunk) > up.expected_size:
-        await _send(writer, _err("too_large"))
+        await fail("too_large")
         return
 
-    with up.temp_path.open("ab") as f:
-        f.write(chunk)
-    up.hasher.update(chunk)
-    up.received += len(chunk)
+    up.last_active = time.monotonic()
+    await asyncio.to_thread(_write_and_hash, up, chunk)
     up.next_seq += 1
-    await _send(writer, _ok(received=up.received, expected=up.expected_size))
+    if up.next_seq % up.ack_every == 0 or up.received == up.expected_size:
+        await _send_bytes(writer, json_dumps({"ok": True, "received": up.received, "expected": up.expected_size}))
 
 
 async def handle_upload_finish(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
 
     upload_id = str((data.get("uploadId") or "")).strip()
     up = UPLOADS.get(upload_id)
     if not up:
-        await _send(writer, _err("no_such_upload"))
+        await _send_bytes(writer, _ERR_NO_SUCH_UPLOAD)
         return
     if up.developer_id != sess.developer_id:
         await _send(writer, _err("not_owner"))
@@ -432,17 +617,14 @@ async def handle_upload_finish(writer: asyncio.StreamWriter, data: dict):
         await _send(writer, _err("hash_mismatch", got=digest, expected=up.expected_sha256))
         return
 
-    # Move into uploaded_games and extract.
+    # Move into uploaded_games and extract (off the event loop).
+    up.last_active = time.monotonic()
     game_dir = UPLOAD_ROOT / up.game_id / up.version
     zip_path = game_dir / "package.zip"
     extracted_path = game_dir / "extracted"
-    game_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        shutil.move(str(up.temp_path), str(zip_path))
-        if extracted_path.exists():
-            shutil.rmtree(extracted_path)
-        _safe_extract_zip(zip_path, extracted_path)
+        await asyncio.to_thread(_install_package, up, zip_path, extracted_path)
     except Exception as e:
         await _send(writer, _err(f"extract_failed:{e}"))
         return
@@ -455,7 +637,7 @@ async def handle_upload_finish(writer: asyncio.StreamWriter, data: dict):
             package_root = children[0]
 
     # Validate manifest
-    manifest, err, raw = load_manifest_from_dir(package_root)
+    manifest, err, raw = await asyncio.to_thread(load_manifest_from_dir, package_root)
     if not manifest:
         await _send(writer, _err(err or "bad_manifest"))
         return
@@ -500,7 +682,7 @@ async def handle_upload_finish(writer: asyncio.StreamWriter, data: dict):
                 "sha256": up.expected_sha256,
                 "zipPath": str(zip_path),
                 "extractedPath": str(package_root),
-                "manifestJson": json.dumps(raw, ensure_ascii=False),
+                "manifestJson": raw,
                 "clientType": manifest.clientType,
                 "minPlayers": manifest.minPlayers,
                 "maxPlayers": manifest.maxPlayers,
@@ -515,36 +697,50 @@ async def handle_upload_finish(writer: asyncio.StreamWriter, data: dict):
     await _send(writer, _ok(gameVersionId=(gv.get("data") or {}).get("gameVersionId")))
 
 
+# Shared read-only `data` for requests that carry none. It is not a dict:
+# handlers must not mutate it or hand it to an encoder as-is (use `data or {}`).
+_EMPTY = MappingProxyType({})
+
+# Request type -> handler(writer, data). game_upload_chunk_bin is handled in
+# handle() itself because its payload frame must be read off the connection.
+_HANDLERS: Dict[str, Callable[[asyncio.StreamWriter, dict], Awaitable[None]]] = {
+    "dev_register": handle_register,
+    "dev_login": handle_login,
+    "dev_logout": lambda w, _d: handle_logout(w),
+    "game_list_mine": lambda w, _d: handle_game_list_mine(w),
+    "game_delist": handle_game_delist,
+    "game_list_versions": handle_game_versions,
+    "game_upload_init": handle_upload_init,
+    "game_upload_chunk": handle_upload_chunk,
+    "game_upload_finish": handle_upload_finish,
+}
+
+
 async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # Small acks must not sit behind Nagle waiting for the client's delayed ACK.
+    set_low_latency(writer.get_extra_info("socket"))
+    writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER, low=WRITE_LOW_WATER)
     try:
         while True:
             frame = await recv_frame(reader)
             if frame is None:
                 break
-            msg = json.loads(frame.decode("utf-8"))
+            msg = json_loads(frame)
             typ = msg.get("type")
-            data = msg.get("data", {}) or {}
-
-            if typ == "dev_register":
-                await handle_register(writer, data)
-            elif typ == "dev_login":
-                await handle_login(writer, data)
-            elif typ == "dev_logout":
-                await handle_logout(writer)
-            elif typ == "game_list_mine":
-                await handle_game_list_mine(writer)
-            elif typ == "game_delist":
-                await handle_game_delist(writer, data)
-            elif typ == "game_list_versions":
-                await handle_game_versions(writer, data)
-            elif typ == "game_upload_init":
-                await handle_upload_init(writer, data)
-            elif typ == "game_upload_chunk":
-                await handle_upload_chunk(writer, data)
-            elif typ == "game_upload_finish":
-                await handle_upload_finish(writer, data)
-            else:
+            data = msg.get("data") or _EMPTY
+
+            if typ == "game_upload_chunk_bin":
+                # The chunk bytes follow as their own frame; always consume it.
+                payload = await recv_frame(reader)
+                if payload is None:
+                    break
+                await handle_upload_chunk(writer, data, payload)
+                continue
+            fn = _HANDLERS.get(typ) if isinstance(typ, str) else None
+            if fn is None:
                 await _send(writer, _err("unknown_type"))
+                continue
+            await fn(writer, data)
     except FramingError:
         pass
     except Exception:
@@ -552,9 +748,10 @@ async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
             await _send(writer, _err("server_exception"))
     finally:
         # cleanup sessions bound to this writer
-        sess = SESSIONS.pop(writer, None)
+        sess = _pop_session(writer)
         if sess:
             ONLINE_DEVS.pop(sess.developer_id, None)
+            _drop_uploads(sess.developer_id)
         writer.close()
         with contextlib.suppress(Exception):
             await writer.wait_closed()
@@ -564,12 +761,15 @@ async def main():
     UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
     TMP_ROOT.mkdir(parents=True, exist_ok=True)
     server = await asyncio.start_server(handle, HOST, PORT)
-    print(f"[DevServer] listen on {HOST}:{PORT} | upload_root={UPLOAD_ROOT}")
-    async with server:
-        await server.serve_forever()
+    await DB_POOL.warm()
+    print(f"[DevServer] listen on {HOST}:{PORT} | upload_root={UPLOAD_ROOT} | {ssl.OPENSSL_VERSION}")
+    reaper = asyncio.create_task(_upload_reaper())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reaper.cancel()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-    if not file_name:
-        file_name = f"{game_id}-{version}.zip"
+    run_event_loop(main())
@@ -17,20 +17,24 @@ from __future__ import annotations
 import asyncio
 import base64
 import contextlib
-import json
+import functools
+import itertools
 import os
 import secrets
 import socket
+import string
 import sys
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Awaitable, BinaryIO, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
 
 from hw3.common.config import get_int, get_str, load_config, resolve_path, section
-from hw3.common.framing import FramingError, recv_frame, send_frame
+from hw3.common.framing import HDR, MAX_FRAME, FramingError, json_dumps, json_loads, recv_frame, send_frame, set_low_latency
 from hw3.common.manifest import load_manifest_from_dir
-from hw3.server.db_rpc import db_call
+from hw3.server.db_rpc import DB_POOL, db_call, run_event_loop, table_rows
 
 
 _CFG_LOBBY = section("lobbyServer")
@@ -68,9 +72,27 @@ if not RUN_ROOT.is_absolute():
     RUN_ROOT = resolve_path(str(RUN_ROOT))
 
 
+# Accept queue for login bursts (the kernel caps it at net.core.somaxconn), and
+# the StreamReader buffer size: requests are small, so 16 KiB instead of 64 KiB
+# per connection. Frames larger than this are still read, just in pieces.
+LISTEN_BACKLOG = 2048
+READ_BUFFER_LIMIT = 16 * 1024
+WRITE_HIGH_WATER = 64 * 1024
+WRITE_LOW_WATER = 16 * 1024
+
+# Environment for spawned game servers; per-match HW3_* variables are added on top.
+_BASE_ENV = {**os.environ, "PYTHONUNBUFFERED": "1"}
+
+# Events queued for a player beyond this mean a stalled client; it is disconnected.
+EVENT_QUEUE_MAX = 256
+
 # Keep a comfortable margin under 64KiB after base64 + JSON overhead.
 MAX_B64_CHUNK = 32 * 1024  # raw bytes per chunk (base64 expands)
 
+# Downloads with no chunk request for this long are dropped by the reaper task.
+DOWNLOAD_IDLE_TTL = int(os.environ.get("NP_HW3_DOWNLOAD_TTL") or get_int(_CFG_LOBBY, "downloadTtlSeconds") or 300)
+DOWNLOAD_REAP_INTERVAL = 60
+
 
 def _ok(**kwargs):
     return {"ok": True, **kwargs}
@@ -81,33 +103,80 @@ def _err(msg: str, **kwargs):
 
 
 async def _send(writer: asyncio.StreamWriter, obj: dict):
-    await send_frame(writer, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+    await send_frame(writer, json_dumps(obj))
+
+
+async def _send_bytes(writer: asyncio.StreamWriter, payload: bytes):
+    """Send an already-serialized reply (see the _OK_* / _ERR_* constants)."""
+    await send_frame(writer, payload)
+
 
+# Fixed replies, serialized once.
+_OK_EMPTY = json_dumps(_ok())
+_ERR_NOT_LOGGED_IN = json_dumps(_err("not_logged_in"))
+_ERR_MISSING_FIELDS = json_dumps(_err("missing_fields"))
+_ERR_BAD_ROOM_ID = json_dumps(_err("bad_room_id"))
+_ERR_NO_SUCH_ROOM = json_dumps(_err("no_such_room"))
+_ERR_BAD_REQUEST = json_dumps(_err("bad_request"))
+_ERR_NO_SUCH_DOWNLOAD = json_dumps(_err("no_such_download"))
+_ERR_UNKNOWN_TYPE = json_dumps(_err("unknown_type"))
+_ERR_SERVER_EXCEPTION = json_dumps(_err("server_exception"))
 
-async def _push_event(writer: asyncio.StreamWriter, name: str, **data):
-    await _send(writer, {"type": "event", "name": name, "data": data})
+
+# Game ports not handed to a running match. Ports are taken from the left and
+# returned on the right, so a port that was just released is reused last.
+FREE_PORTS: Deque[int] = deque(range(GAME_PORT_MIN, GAME_PORT_MAX + 1))
+
+
+def _port_bindable(p: int) -> bool:
+    with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("0.0.0.0", p))
+            return True
+        except OSError:
+            return False
 
 
 def _select_free_port() -> int:
-    for p in range(GAME_PORT_MIN, GAME_PORT_MAX + 1):
-        with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            try:
-                s.bind(("0.0.0.0", p))
-                return p
-            except OSError:
-                continue
+    # Ports held by some other process are rotated to the back; normally the
+    # first candidate binds and this is a single probe.
+    for _ in range(len(FREE_PORTS)):
+        p = FREE_PORTS.popleft()
+        if _port_bindable(p):
+            return p
+        FREE_PORTS.append(p)
     raise RuntimeError("no_free_port")
 
 
+def _release_port(port: Optional[int]) -> None:
+    if port is not None:
+        FREE_PORTS.append(port)
+
+
+def _compile_arg(template: str) -> Callable[[dict], str]:
+    pieces = list(string.Formatter().parse(template))
+    if any(name is not None and (not name.isidentifier() or spec or conv) for _, name, spec, conv in pieces):
+        return lambda mapping: template.format(**mapping)  # attribute/index/spec: let format() handle it
+    if all(name is None for _, name, _, _ in pieces):
+        text = "".join(lit for lit, _, _, _ in pieces)
+        return lambda mapping: text
+    fields = [(lit, name) for lit, name, _, _ in pieces]
+    return lambda mapping: "".join(lit + ("" if name is None else str(mapping[name])) for lit, name in fields)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_argv(argv: Tuple[str, ...]) -> Callable[[dict], List[str]]:
+    """Parse a manifest's argv templates once; the result renders them for a mapping."""
+    parts = [_compile_arg(a) for a in argv]
+    return lambda mapping: [p(mapping) for p in parts]
+
+
 def _fmt_argv(argv: List[str], mapping: dict) -> List[str]:
-    out: List[str] = []
-    for a in argv:
-        try:
-            out.append(str(a).format(**mapping))
-        except KeyError as e:
-            raise ValueError(f"bad_argv_template:{e}") from e
-    return out
+    try:
+        return _compile_argv(tuple(str(a) for a in argv))(mapping)
+    except KeyError as e:
+        raise ValueError(f"bad_argv_template:{e}") from e
 
 
 @dataclass
@@ -116,13 +185,17 @@ class PlayerSession:
     username: str
     writer: asyncio.StreamWriter
     room_id: Optional[int] = None
+    # Encoded event frames, written out by writer_task (_event_writer).
+    out_queue: "asyncio.Queue[bytes]" = field(default_factory=lambda: asyncio.Queue(maxsize=EVENT_QUEUE_MAX))
+    writer_task: "Optional[asyncio.Task[None]]" = None
 
 
 @dataclass
 class RoomLive:
     room_id: int
     host_player_id: int
-    players: List[int] = field(default_factory=list)
+    players: Dict[int, None] = field(default_factory=dict)  # ordered set, in join order
+    max_players: int = 2
     game_id: str = ""
     version: str = ""
     game_db_id: int = 0
@@ -142,25 +215,108 @@ class DownloadSession:
     sha256: str
     game_id: str
     version: str
+    zip_file: BinaryIO  # open for the whole download
+    owner: asyncio.StreamWriter
+    last_active: float = field(default_factory=time.monotonic)
 
 
-SESSIONS_BY_WRITER: Dict[asyncio.StreamWriter, PlayerSession] = {}
+# The PlayerSession lives on its connection's writer (writer._player_session);
+# SESSIONS_BY_PLAYER_ID is the reverse lookup.
 SESSIONS_BY_PLAYER_ID: Dict[int, PlayerSession] = {}
 
 ROOMS: Dict[int, RoomLive] = {}
 DOWNLOADS: Dict[str, DownloadSession] = {}
+# Download ids only need to be unique: a session answers its own connection only.
+_DOWNLOAD_ID_PREFIX = secrets.token_hex(8)
+_DOWNLOAD_ID_SEQ = itertools.count(1)
+# Writers sending raw payload frames (_hold_writer) -> future resolved when done.
+_SENDFILE_BUSY: Dict[asyncio.StreamWriter, "asyncio.Future[None]"] = {}
+# Disconnect cleanups still running (see handle()); strong refs keep them alive.
+_PENDING_CLEANUPS: "Set[asyncio.Task[None]]" = set()
 
 
 def _require_login(writer: asyncio.StreamWriter) -> Optional[PlayerSession]:
-    return SESSIONS_BY_WRITER.get(writer)
+    return getattr(writer, "_player_session", None)
+
+
+def _pop_session(writer: asyncio.StreamWriter) -> Optional[PlayerSession]:
+    sess = getattr(writer, "_player_session", None)
+    writer._player_session = None  # type: ignore[attr-defined]
+    return sess
 
 
-async def _push_event_to_player(player_id: int, name: str, **data):
+def _push_event_to_player(player_id: int, name: str, **data) -> None:
+    """Queue an event for the player's writer task; never waits on their socket."""
     sess = SESSIONS_BY_PLAYER_ID.get(player_id)
     if not sess:
         return
-    with contextlib.suppress(Exception):
-        await _push_event(sess.writer, name, **data)
+    frame = json_dumps({"type": "event", "name": name, "data": data})
+    if len(frame) > MAX_FRAME:
+        return
+    try:
+        sess.out_queue.put_nowait(frame)
+    except asyncio.QueueFull:
+        sess.writer.close()  # slow consumer; handle() cleans up on EOF
+
+
+def _room_snapshot(live: RoomLive) -> dict:
+    """The room_detail fields the lobby tracks in memory; sent with room_updated."""
+    return {
+        "id": live.room_id,
+        "gameId": live.game_id,
+        "version": live.version,
+        "status": live.status,
+        "hostPlayerId": live.host_player_id,
+        "players": list(live.players),
+        "maxPlayers": live.max_players,
+    }
+
+
+def _broadcast_room(live: RoomLive) -> None:
+    """Push the room's current state to its members so they need not poll room_detail."""
+    room = _room_snapshot(live)
+    for u in live.players:
+        _push_event_to_player(u, "room_updated", roomId=live.room_id, room=room)
+
+
+_BATCH_HEAD = b'{"type":"events","items":['
+_BATCH_TAIL = b"]}"
+
+
+def _batch_events(frames: List[bytes]) -> List[bytes]:
+    """Splice already-encoded event objects into as few `events` frames as fit in MAX_FRAME."""
+    if len(frames) == 1:
+        return frames
+    out: List[bytes] = []
+    group: List[bytes] = []
+    size = len(_BATCH_HEAD) + len(_BATCH_TAIL)
+    for f in frames:
+        if group and size + len(f) + 1 > MAX_FRAME:
+            out.append(_BATCH_HEAD + b",".join(group) + _BATCH_TAIL)
+            group = []
+            size = len(_BATCH_HEAD) + len(_BATCH_TAIL)
+        group.append(f)
+        size += len(f) + 1
+    out.append(_BATCH_HEAD + b",".join(group) + _BATCH_TAIL if len(group) > 1 else group[0])
+    return out
+
+
+async def _event_writer(sess: PlayerSession) -> None:
+    """Drain a player's event queue; events queued meanwhile go out batched, in one write + drain."""
+    q = sess.out_queue
+    writer = sess.writer
+    try:
+        while True:
+            frames = [await q.get()]
+            while not q.empty():
+                frames.append(q.get_nowait())
+            # Raw payload frames in flight on this socket must not be split up.
+            while (busy := _SENDFILE_BUSY.get(writer)) is not None:
+                await busy
+            writer.writelines([part for f in _batch_events(frames) for part in (HDR.pack(len(f)), f)])
+            await writer.drain()
+    except (ConnectionError, RuntimeError):
+        pass
 
 
 async def _ensure_room_live(room_id: int) -> Optional[RoomLive]:
@@ -174,7 +330,8 @@ async def _ensure_room_live(room_id: int) -> Optional[RoomLive]:
     live = RoomLive(
         room_id=int(d["id"]),
         host_player_id=int(d["hostPlayerId"]),
-        players=[int(x) for x in (d.get("players") or [])],
+        players=dict.fromkeys(int(x) for x in (d.get("players") or [])),
+        max_players=int(d.get("maxPlayers") or 2),
         game_id=str(d.get("gameId") or ""),
         version=str(d.get("version") or ""),
         game_db_id=int(d.get("gameDbId") or 0),
@@ -189,7 +346,7 @@ async def _ensure_room_live(room_id: int) -> Optional[RoomLive]:
 # Auth
 # -------------------------
 async def handle_player_register(writer: asyncio.StreamWriter, data: dict):
-    resp = await db_call({"collection": "PlayerUser", "action": "register", "data": data})
+    resp = await db_call({"collection": "PlayerUser", "action": "register", "data": data or {}})
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "register_failed")))
         return
@@ -197,7 +354,7 @@ async def handle_player_register(writer: asyncio.StreamWriter, data: dict):
 
 
 async def handle_player_login(writer: asyncio.StreamWriter, data: dict):
-    resp = await db_call({"collection": "PlayerUser", "action": "login", "data": data})
+    resp = await db_call({"collection": "PlayerUser", "action": "login", "data": data or {}})
     if resp.get("status") != "OK":
         await _send(writer, _err(resp.get("error", "login_failed")))
         return
@@ -211,7 +368,8 @@ async def handle_player_login(writer: asyncio.StreamWriter, data: dict):
         await _send(writer, _err("already_online"))
         return
     sess = PlayerSession(player_id=pid, username=username, writer=writer)
-    SESSIONS_BY_WRITER[writer] = sess
+    sess.writer_task = asyncio.get_running_loop().create_task(_event_writer(sess))
+    writer._player_session = sess  # type: ignore[attr-defined]
     SESSIONS_BY_PLAYER_ID[pid] = sess
     await _send(writer, _ok(playerId=pid, username=username))
 
@@ -223,11 +381,13 @@ async def handle_player_list(writer: asyncio.StreamWriter):
     """
     Minimal "lobby status" support: list currently online players.
     """
+    # Load every room that is not cached yet in one concurrent wave, then build
+    # the list without awaiting (so the sessions dict cannot change under us).
+    rids = {sess.room_id for sess in SESSIONS_BY_PLAYER_ID.values() if sess.room_id is not None}
+    await asyncio.gather(*(_ensure_room_live(rid) for rid in rids if rid not in ROOMS))
     players = []
     for pid, sess in SESSIONS_BY_PLAYER_ID.items():
-        room = None
-        if sess.room_id is not None:
-            room = await _ensure_room_live(sess.room_id)
+        room = ROOMS.get(sess.room_id) if sess.room_id is not None else None
         players.append(
             {
                 "playerId": int(pid),
@@ -245,43 +405,82 @@ async def handle_player_list(writer: asyncio.StreamWriter):
 # -------------------------
 # Store browsing (P1)
 # -------------------------
-async def handle_store_list_games(writer: asyncio.StreamWriter):
+# The store listing is read far more often than games change; concurrent
+# requests share one DB fanout, and its encoded reply is reused for
+# STORE_LIST_TTL seconds. Games are edited through the developer server, a
+# separate process, so the short TTL is what bounds staleness.
+STORE_LIST_TTL = 2.0
+_STORE_CACHE: Optional[Tuple[float, bytes]] = None
+_STORE_REFRESH: "Optional[asyncio.Task[Tuple[Optional[bytes], str]]]" = None
+
+
+async def _store_reply() -> Tuple[Optional[bytes], str]:
+    """The serialized store_list_games reply, or (None, error)."""
+    global _STORE_REFRESH
+    cached = _STORE_CACHE
+    if cached and time.monotonic() - cached[0] < STORE_LIST_TTL:
+        return cached[1], ""
+    if _STORE_REFRESH is None:
+        _STORE_REFRESH = asyncio.get_running_loop().create_task(_load_store_reply())
+        _STORE_REFRESH.add_done_callback(_store_refresh_done)
+    return await asyncio.shield(_STORE_REFRESH)
+
+
+def _store_refresh_done(task: asyncio.Task) -> None:
+    global _STORE_REFRESH, _STORE_CACHE
+    _STORE_REFRESH = None
+    if not task.cancelled() and task.exception() is None:
+        reply, _ = task.result()
+        if reply is not None:
+            _STORE_CACHE = (time.monotonic(), reply)
+
+
+async def _load_store_reply() -> Tuple[Optional[bytes], str]:
     r = await db_call({"collection": "Game", "action": "list_public", "data": {}})
     if r.get("status") != "OK":
-        await _send(writer, _err(r.get("error", "list_failed")))
-        return
-    games = r.get("games") or []
+        return None, r.get("error", "list_failed")
+    games = table_rows(r.get("games"))
+    # Developer names and latest versions for every game: two batched RPCs, in flight together.
+    devs, latest = await asyncio.gather(
+        db_call(
+            {
+                "collection": "DevUser",
+                "action": "get_by_ids",
+                "data": {"developerIds": [int(g.get("developerId") or 0) for g in games]},
+            }
+        ),
+        db_call({"collection": "GameVersion", "action": "latest_for_gameIds", "data": {"gameIds": [g.get("gameId") for g in games]}}),
+    )
+    dev_names = {int(d["id"]): d["username"] for d in table_rows(devs.get("data"))} if devs.get("status") == "OK" else {}
+    versions = (latest.get("data") or {}) if latest.get("status") == "OK" else {}
     out = []
     for g in games:
-        gid = g.get("gameId")
-        dev_id = int(g.get("developerId") or 0)
-        dev_username: Optional[str] = None
-        if dev_id > 0:
-            dev = await db_call({"collection": "DevUser", "action": "get_by_id", "data": {"developerId": dev_id}})
-            if dev.get("status") == "OK":
-                dev_username = (dev.get("data") or {}).get("username")
-        latest = await db_call({"collection": "GameVersion", "action": "latest_for_gameId", "data": {"gameId": gid}})
-        if latest.get("status") == "OK":
-            v = latest.get("data") or {}
-            g2 = dict(g)
-            g2["developerUsername"] = dev_username
+        g2 = dict(g)
+        g2["developerUsername"] = dev_names.get(int(g.get("developerId") or 0))
+        v = versions.get(g.get("gameId"))
+        if v:
             g2["latestVersion"] = v.get("version")
             g2["clientType"] = v.get("clientType")
             g2["minPlayers"] = v.get("minPlayers")
             g2["maxPlayers"] = v.get("maxPlayers")
-            out.append(g2)
         else:
-            g2 = dict(g)
-            g2["developerUsername"] = dev_username
             g2["latestVersion"] = None
-            out.append(g2)
-    await _send(writer, _ok(games=out))
+        out.append(g2)
+    return json_dumps(_ok(games=out)), ""
+
+
+async def handle_store_list_games(writer: asyncio.StreamWriter):
+    reply, error = await _store_reply()
+    if reply is None:
+        await _send(writer, _err(error))
+        return
+    await _send_bytes(writer, reply)
 
 
 async def handle_store_game_detail(writer: asyncio.StreamWriter, data: dict):
     game_id = str((data.get("gameId") or "")).strip()
     if not game_id:
-        await _send(writer, _err("missing_fields"))
+        await _send_bytes(writer, _ERR_MISSING_FIELDS)
         return
     g = await db_call({"collection": "Game", "action": "get_by_gameId", "data": {"gameId": game_id}})
     if g.get("status") != "OK":
@@ -315,7 +514,7 @@ async def handle_store_game_detail(writer: asyncio.StreamWriter, data: dict):
 async def handle_store_download_init(writer: asyncio.StreamWriter, data: dict):
     game_id = str((data.get("gameId") or "")).strip()
     if not game_id:
-        await _send(writer, _err("missing_fields"))
+        await _send_bytes(writer, _ERR_MISSING_FIELDS)
         return
     req_version = str((data.get("version") or "")).strip()
     if req_version:
@@ -329,18 +528,26 @@ async def handle_store_download_init(writer: asyncio.StreamWriter, data: dict):
         return
     v = latest.get("data") or {}
     zip_path = Path(str(v.get("zipPath") or ""))
-    if not zip_path.exists():
+    try:
+        zip_file = zip_path.open("rb")
+    except OSError:
         await _send(writer, _err("missing_zip_on_server"))
         return
-    download_id = secrets.token_hex(16)
+    if hasattr(os, "posix_fadvise"):
+        # Chunks are read front to back: let the kernel read ahead aggressively.
+        with contextlib.suppress(OSError):
+            os.posix_fadvise(zip_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    download_id = f"{_DOWNLOAD_ID_PREFIX}{next(_DOWNLOAD_ID_SEQ):016x}"
     sess = DownloadSession(
         download_id=download_id,
         zip_path=zip_path,
         file_name=str(v.get("fileName") or zip_path.name),
-        size_bytes=int(v.get("sizeBytes") or zip_path.stat().st_size),
+        size_bytes=int(v.get("sizeBytes") or os.fstat(zip_file.fileno()).st_size),
         sha256=str(v.get("sha256") or ""),
         game_id=game_id,
         version=str(v.get("version") or ""),
+        zip_file=zip_file,
+        owner=writer,
     )
     DOWNLOADS[download_id] = sess
     await _send(
@@ -356,40 +563,145 @@ async def handle_store_download_init(writer: asyncio.StreamWriter, data: dict):
     )
 
 
-async def handle_store_download_chunk(writer: asyncio.StreamWriter, data: dict):
+def _end_download(sess: DownloadSession) -> None:
+    DOWNLOADS.pop(sess.download_id, None)
+    with contextlib.suppress(OSError):
+        sess.zip_file.close()
+
+
+async def _download_reaper() -> None:
+    """Periodically drop downloads that have seen no chunk request for DOWNLOAD_IDLE_TTL seconds."""
+    while True:
+        await asyncio.sleep(DOWNLOAD_REAP_INTERVAL)
+        cutoff = time.monotonic() - DOWNLOAD_IDLE_TTL
+        for d in [d for d in DOWNLOADS.values() if d.last_active < cutoff]:
+            _end_download(d)
+
+
+async def _download_chunk_request(
+    writer: asyncio.StreamWriter, data: dict, max_chunk: int
+) -> Optional[Tuple[DownloadSession, int, int]]:
     download_id = str((data.get("downloadId") or "")).strip()
     offset = int(data.get("offset") or 0)
-    limit = int(data.get("limit") or MAX_B64_CHUNK)
+    limit = int(data.get("limit") or max_chunk)
     if not download_id or offset < 0:
-        await _send(writer, _err("bad_request"))
-        return
+        await _send_bytes(writer, _ERR_BAD_REQUEST)
+        return None
     sess = DOWNLOADS.get(download_id)
-    if not sess:
-        await _send(writer, _err("no_such_download"))
+    if not sess or sess.owner is not writer:
+        await _send_bytes(writer, _ERR_NO_SUCH_DOWNLOAD)
+        return None
+    sess.last_active = time.monotonic()
+    return sess, offset, max(1, min(limit, max_chunk))
+
+
+def _read_chunk_b64(fd: int, limit: int, offset: int) -> Tuple[int, str]:
+    chunk = os.pread(fd, limit, offset)
+    return len(chunk), base64.b64encode(chunk).decode("ascii")
+
+
+async def handle_store_download_chunk(writer: asyncio.StreamWriter, data: dict):
+    req = await _download_chunk_request(writer, data, MAX_B64_CHUNK)
+    if not req:
         return
-    limit = max(1, min(limit, MAX_B64_CHUNK))
+    sess, offset, limit = req
 
     try:
-        with sess.zip_path.open("rb") as f:
-            f.seek(offset)
-            chunk = f.read(limit)
+        # Disk read + base64 run on a worker thread, not between other clients' requests.
+        size, data_b64 = await asyncio.to_thread(_read_chunk_b64, sess.zip_file.fileno(), limit, offset)
     except Exception:
         await _send(writer, _err("read_failed"))
         return
 
-    done = (offset + len(chunk)) >= sess.size_bytes
+    done = (offset + size) >= sess.size_bytes
     await _send(
         writer,
         _ok(
-            downloadId=download_id,
+            downloadId=sess.download_id,
             offset=offset,
-            dataB64=base64.b64encode(chunk).decode("ascii"),
+            dataB64=data_b64,
             done=done,
         ),
     )
 
     if done:
-        DOWNLOADS.pop(download_id, None)
+        _end_download(sess)
+
+
+@contextlib.contextmanager
+def _hold_writer(writer: asyncio.StreamWriter) -> Iterator[None]:
+    """Keep event frames off this socket: the transport refuses writes during
+    sendfile(), and a run of payload frames must reach the client unbroken."""
+    busy = asyncio.get_running_loop().create_future()
+    _SENDFILE_BUSY[writer] = busy
+    try:
+        yield
+    finally:
+        del _SENDFILE_BUSY[writer]
+        busy.set_result(None)
+
+
+async def _sendfile(writer: asyncio.StreamWriter, f: BinaryIO, offset: int, count: int) -> None:
+    """Copy count bytes of f to the socket; call under _hold_writer()."""
+    loop = asyncio.get_running_loop()
+    try:
+        # Page cache -> socket; asyncio falls back to read+write itself (e.g. TLS).
+        sent = await loop.sendfile(writer.transport, f, offset, count)
+    except NotImplementedError:  # loops without sendfile support (uvloop)
+        chunk = os.pread(f.fileno(), count, offset)
+        sent = len(chunk)
+        writer.write(chunk)
+        await writer.drain()
+    if sent != count:  # file shrank under us; the stream is out of sync now
+        raise ConnectionError("short_sendfile")
+
+
+async def handle_store_download_chunk_bin(writer: asyncio.StreamWriter, data: dict):
+    """Reply with a JSON header frame, then (if payloadLength > 0) the raw bytes as the next frame."""
+    req = await _download_chunk_request(writer, data, MAX_FRAME)
+    if not req:
+        return
+    sess, offset, limit = req
+
+    length = max(0, min(limit, sess.size_bytes - offset))
+    done = (offset + length) >= sess.size_bytes
+    head = json_dumps(_ok(downloadId=sess.download_id, offset=offset, payloadLength=length, done=done))
+    if length:
+        with _hold_writer(writer):
+            writer.writelines((HDR.pack(len(head)), head, HDR.pack(length)))
+            await _sendfile(writer, sess.zip_file, offset, length)
+    else:
+        await send_frame(writer, head)
+
+    if done:
+        _end_download(sess)
+
+
+async def handle_store_download_stream(writer: asyncio.StreamWriter, data: dict):
+    """Like store_download_chunk_bin, but `limit` (default: the rest of the file) may span
+    many frames: payloadLength bytes follow the header as back-to-back raw frames of
+    up to MAX_FRAME each, with no request per frame."""
+    req = await _download_chunk_request(writer, data, sys.maxsize)
+    if not req:
+        return
+    sess, offset, limit = req
+
+    length = max(0, min(limit, sess.size_bytes - offset))
+    done = (offset + length) >= sess.size_bytes
+    head = json_dumps(_ok(downloadId=sess.download_id, offset=offset, payloadLength=length, done=done))
+    with _hold_writer(writer):
+        writer.writelines((HDR.pack(len(head)), head))
+        end = offset + length
+        while offset < end:
+            n = min(MAX_FRAME, end - offset)
+            writer.write(HDR.pack(n))
+            await _sendfile(writer, sess.zip_file, offset, n)
+            offset += n
+            sess.last_active = time.monotonic()
+        await writer.drain()
+
+    if done:
+        _end_download(sess)
 
 
 # -------------------------
@@ -400,12 +712,12 @@ async def handle_room_list(writer: asyncio.StreamWriter):
     if r.get("status") != "OK":
         await _send(writer, _err(r.get("error", "list_failed")))
         return
-    await _send(writer, _ok(rooms=r.get("rooms") or []))
+    await _send(writer, _ok(rooms=table_rows(r.get("rooms"))))
 
 async def handle_room_detail(writer: asyncio.StreamWriter, data: dict):
     room_id = int(data.get("roomId") or 0)
     if room_id <= 0:
-        await _send(writer, _err("bad_room_id"))
+        await _send_bytes(writer, _ERR_BAD_ROOM_ID)
         return
     r = await db_call({"collection": "Room", "action": "get", "data": {"roomId": room_id}})
     if r.get("status") != "OK":
@@ -417,14 +729,14 @@ async def handle_room_detail(writer: asyncio.StreamWriter, data: dict):
 async def handle_room_create(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     if sess.room_id is not None:
         await _send(writer, _err("already_in_room", roomId=sess.room_id))
         return
     game_id = str((data.get("gameId") or "")).strip()
     if not game_id:
-        await _send(writer, _err("missing_fields"))
+        await _send_bytes(writer, _ERR_MISSING_FIELDS)
         return
 
     g = await db_call({"collection": "Game", "action": "get_by_gameId", "data": {"gameId": game_id}})
@@ -465,51 +777,48 @@ async def handle_room_create(writer: asyncio.StreamWriter, data: dict):
 async def handle_room_join(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     if sess.room_id is not None:
         await _send(writer, _err("already_in_room", roomId=sess.room_id))
         return
     room_id = int(data.get("roomId") or 0)
     if room_id <= 0:
-        await _send(writer, _err("bad_room_id"))
+        await _send_bytes(writer, _ERR_BAD_ROOM_ID)
         return
     live = await _ensure_room_live(room_id)
     if not live:
-        await _send(writer, _err("no_such_room"))
+        await _send_bytes(writer, _ERR_NO_SUCH_ROOM)
         return
     if live.status == "playing":
         await _send(writer, _err("room_playing"))
         return
 
-    # Refresh from DB for authoritative player list
-    r = await db_call({"collection": "Room", "action": "get", "data": {"roomId": room_id}})
-    if r.get("status") != "OK":
-        await _send(writer, _err(r.get("error", "no_such_room")))
-        return
-    rd = r.get("data") or {}
-    players = [int(x) for x in (rd.get("players") or [])]
-    max_players = int(rd.get("maxPlayers") or 2)
-    if sess.player_id in players:
+    # Every membership change goes through this process, so live.players is
+    # authoritative once loaded; no second Room.get is needed.
+    if sess.player_id in live.players:
         sess.room_id = room_id
         await _send(writer, _ok(roomId=room_id, joined=True))
         return
-    if len(players) >= max_players:
+    if len(live.players) >= live.max_players:
         await _send(writer, _err("room_full"))
         return
 
+    # Hold the seat while add_member is in flight so concurrent joins see it.
+    live.players[sess.player_id] = None
     add = await db_call({"collection": "Room", "action": "add_member", "data": {"roomId": room_id, "playerId": sess.player_id}})
     if add.get("status") != "OK":
+        live.players.pop(sess.player_id, None)
         await _send(writer, _err(add.get("error", "join_failed")))
         return
 
-    live.players = sorted(set(players + [sess.player_id]))
     sess.room_id = room_id
-    await _send(writer, _ok(roomId=room_id, joined=True))
+    await _send(writer, _ok(roomId=room_id, joined=True, room=_room_snapshot(live)))
     # Notify room
     for u in live.players:
         if u != sess.player_id:
-            await _push_event_to_player(u, "player_joined", roomId=room_id, playerId=sess.player_id)
+            _push_event_to_player(u, "player_joined", roomId=room_id, playerId=sess.player_id)
+    _broadcast_room(live)
 
 
 async def _handle_room_leave(sess: PlayerSession, *, force: bool = False):
@@ -524,19 +833,19 @@ async def _handle_room_leave(sess: PlayerSession, *, force: bool = False):
     _ = await db_call({"collection": "Room", "action": "remove_member", "data": {"roomId": rid, "playerId": sess.player_id}})
 
     if live:
-        if sess.player_id in live.players:
-            live.players = [u for u in live.players if u != sess.player_id]
+        live.players.pop(sess.player_id, None)
 
         # host reassignment
         if live.players and live.host_player_id == sess.player_id:
-            new_host = live.players[0]
+            new_host = next(iter(live.players))
             live.host_player_id = new_host
             _ = await db_call({"collection": "Room", "action": "set_host", "data": {"roomId": rid, "hostPlayerId": new_host}})
             for u in live.players:
-                await _push_event_to_player(u, "host_changed", roomId=rid, hostPlayerId=new_host)
+                _push_event_to_player(u, "host_changed", roomId=rid, hostPlayerId=new_host)
 
         for u in live.players:
-            await _push_event_to_player(u, "player_left", roomId=rid, playerId=sess.player_id)
+            _push_event_to_player(u, "player_left", roomId=rid, playerId=sess.player_id)
+        _broadcast_room(live)
 
         if not live.players:
             _ = await db_call({"collection": "Room", "action": "delete_if_empty", "data": {"roomId": rid}})
@@ -548,7 +857,7 @@ async def _handle_room_leave(sess: PlayerSession, *, force: bool = False):
 async def handle_room_leave(writer: asyncio.StreamWriter):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     live = await _ensure_room_live(sess.room_id) if sess.room_id else None
     if live and live.status == "playing":
@@ -559,7 +868,7 @@ async def handle_room_leave(writer: asyncio.StreamWriter):
 
 
 async def _cleanup_connection(writer: asyncio.StreamWriter, *, notify_client: bool):
-    sess = SESSIONS_BY_WRITER.pop(writer, None)
+    sess = _pop_session(writer)
     if not sess:
         if notify_client:
             with contextlib.suppress(Exception):
@@ -567,6 +876,8 @@ async def _cleanup_connection(writer: asyncio.StreamWriter, *, notify_client: bo
         return
 
     SESSIONS_BY_PLAYER_ID.pop(sess.player_id, None)
+    if sess.writer_task:
+        sess.writer_task.cancel()
 
     # On disconnect, always leave room. If a match is running, end it.
     if sess.room_id is not None:
@@ -610,13 +921,12 @@ async def _finish_match(room_id: int, *, result: Optional[dict] = None):
             winner_pid = int(winner) if winner is not None else None
             # Store a consistent envelope that at least records participants so we can
             # later enforce "must have played before reviewing" (P4).
-            results_json = json.dumps(
+            results_json = json_dumps(
                 {
-                    "players": [{"userId": int(pid)} for pid in list(live.players)],
+                    "players": [{"userId": pid} for pid in live.players],
                     "results": result.get("results") or [],
-                },
-                ensure_ascii=False,
-            )
+                }
+            ).decode("utf-8")
             _ = await db_call(
                 {
                     "collection": "MatchLog",
@@ -641,12 +951,14 @@ async def _finish_match(room_id: int, *, result: Optional[dict] = None):
 
     live.status = "waiting"
     live.token = None
+    _release_port(live.game_port)
     live.game_port = None
     live.game_proc = None
     _ = await db_call({"collection": "Room", "action": "set_status", "data": {"roomId": room_id, "status": "waiting"}})
 
     for u in list(live.players):
-        await _push_event_to_player(u, "game_ready", roomId=room_id, result=(result or {}))
+        _push_event_to_player(u, "game_ready", roomId=room_id, result=(result or {}))
+    _broadcast_room(live)
 
 
 async def _watch_game(room_id: int, proc: asyncio.subprocess.Process):
@@ -666,15 +978,15 @@ async def _watch_game(room_id: int, proc: asyncio.subprocess.Process):
 async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     rid = int(data.get("roomId") or (sess.room_id or 0))
     if rid <= 0:
-        await _send(writer, _err("bad_room_id"))
+        await _send_bytes(writer, _ERR_BAD_ROOM_ID)
         return
     live = await _ensure_room_live(rid)
     if not live:
-        await _send(writer, _err("no_such_room"))
+        await _send_bytes(writer, _ERR_NO_SUCH_ROOM)
         return
     if sess.player_id != live.host_player_id:
         await _send(writer, _err("not_host"))
@@ -708,7 +1020,7 @@ async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
         return
     v = gv.get("data") or {}
     extracted_path = Path(str(v.get("extractedPath") or ""))
-    manifest, err, _raw = load_manifest_from_dir(extracted_path)
+    manifest, err, _raw = await asyncio.to_thread(load_manifest_from_dir, extracted_path)
     if not manifest:
         await _send(writer, _err(err or "bad_manifest"))
         return
@@ -734,22 +1046,20 @@ async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
     try:
         argv = _fmt_argv(manifest.server.argv, mapping)
     except Exception as e:
+        _release_port(port)
         await _send(writer, _err(f"bad_manifest_argv:{e}"))
         return
 
-    env = os.environ.copy()
-    env.update(
-        {
-            "HW3_LOBBY_HOST": mapping["lobbyHost"],
-            "HW3_LOBBY_PORT": str(mapping["lobbyPort"]),
-            "HW3_ROOM_ID": str(rid),
-            "HW3_TOKEN": token,
-            "HW3_GAME_ID": live.game_id,
-            "HW3_VERSION": live.version,
-            "HW3_EXPECTED_PLAYERS": str(len(players)),
-            "PYTHONUNBUFFERED": "1",
-        }
-    )
+    env = {
+        **_BASE_ENV,
+        "HW3_LOBBY_HOST": mapping["lobbyHost"],
+        "HW3_LOBBY_PORT": str(mapping["lobbyPort"]),
+        "HW3_ROOM_ID": str(rid),
+        "HW3_TOKEN": token,
+        "HW3_GAME_ID": live.game_id,
+        "HW3_VERSION": live.version,
+        "HW3_EXPECTED_PLAYERS": str(len(players)),
+    }
 
     try:
         log_dir = RUN_ROOT / "logs"
@@ -767,11 +1077,12 @@ async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
             env=env,
         )
     except Exception as e:
+        _release_port(port)
         await _send(writer, _err(f"spawn_failed:{e}"))
         return
 
     live.status = "playing"
-    live.players = players
+    live.players = dict.fromkeys(players)
     live.token = token
     live.game_port = port
     live.game_proc = proc
@@ -779,7 +1090,7 @@ async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
 
     # push game_info to all room members
     for u in players:
-        await _push_event_to_player(
+        _push_event_to_player(
             u,
             "game_info",
             roomId=rid,
@@ -789,6 +1100,7 @@ async def handle_room_start(writer: asyncio.StreamWriter, data: dict):
             port=port,
             token=token,
         )
+    _broadcast_room(live)
 
     asyncio.create_task(_watch_game(rid, proc))
     await _send(writer, _ok(started=True, port=port))
@@ -803,7 +1115,7 @@ async def handle_post_result(writer: asyncio.StreamWriter, data: dict):
     except Exception:
         rid = 0
     if rid <= 0:
-        await _send(writer, _err("bad_room_id"))
+        await _send_bytes(writer, _ERR_BAD_ROOM_ID)
         return
     await _finish_match(rid, result=data)
     await _send(writer, _ok(posted=True))
@@ -815,11 +1127,11 @@ async def handle_post_result(writer: asyncio.StreamWriter, data: dict):
 async def handle_review_upsert(writer: asyncio.StreamWriter, data: dict):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     game_id = str((data.get("gameId") or "")).strip()
     if not game_id:
-        await _send(writer, _err("missing_fields"))
+        await _send_bytes(writer, _ERR_MISSING_FIELDS)
         return
     # Enforce spec P4: player must have actually played the game before reviewing.
     played = await db_call(
@@ -837,12 +1149,12 @@ async def handle_review_upsert(writer: asyncio.StreamWriter, data: dict):
     if r.get("status") != "OK":
         await _send(writer, _err(r.get("error", "review_failed")))
         return
-    await _send(writer, _ok())
+    await _send_bytes(writer, _OK_EMPTY)
 
 async def handle_match_list_mine(writer: asyncio.StreamWriter):
     sess = _require_login(writer)
     if not sess:
-        await _send(writer, _err("not_logged_in"))
+        await _send_bytes(writer, _ERR_NOT_LOGGED_IN)
         return
     r = await db_call({"collection": "MatchLog", "action": "list_by_player", "data": {"playerId": sess.player_id}})
     if r.get("status") != "OK":
@@ -851,75 +1163,99 @@ async def handle_match_list_mine(writer: asyncio.StreamWriter):
     await _send(writer, _ok(logs=r.get("logs") or []))
 
 
+# Shared read-only `data` for requests that carry none. It is not a dict:
+# handlers must not mutate it or hand it to an encoder as-is (use `data or {}`).
+_EMPTY = MappingProxyType({})
+
+# Request type -> handler(writer, data).
+_HANDLERS: Dict[str, Callable[[asyncio.StreamWriter, dict], Awaitable[None]]] = {
+    "player_register": handle_player_register,
+    "player_login": handle_player_login,
+    "player_logout": lambda w, _d: handle_player_logout(w),
+    "player_list": lambda w, _d: handle_player_list(w),
+    "store_list_games": lambda w, _d: handle_store_list_games(w),
+    "store_game_detail": handle_store_game_detail,
+    "store_download_init": handle_store_download_init,
+    "store_download_chunk": handle_store_download_chunk,
+    "store_download_chunk_bin": handle_store_download_chunk_bin,
+    "store_download_stream": handle_store_download_stream,
+    "room_list": lambda w, _d: handle_room_list(w),
+    "room_detail": handle_room_detail,
+    "room_create": handle_room_create,
+    "room_join": handle_room_join,
+    "room_leave": lambda w, _d: handle_room_leave(w),
+    "room_start": handle_room_start,
+    "post_result": handle_post_result,
+    "review_create_or_update": handle_review_upsert,
+    "match_list_mine": lambda w, _d: handle_match_list_mine(w),
+}
+
+
 async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    set_low_latency(writer.get_extra_info("socket"))
+    # Replies may sit in the transport buffer up to WRITE_HIGH_WATER without
+    # drain() waiting; past that a slow client pushes back on its own handler
+    # and writer task until the buffer is down to WRITE_LOW_WATER.
+    writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER, low=WRITE_LOW_WATER)
+    # Locals for the per-frame loop (LOAD_FAST instead of global dict lookups).
+    recv = recv_frame
+    loads = json_loads
+    handlers = _HANDLERS
+    chunk_bin = handle_store_download_chunk_bin
+    chunk_b64 = handle_store_download_chunk
     try:
         await _send(writer, _ok(hello="hw3_lobby_ready"))
         while True:
-            frame = await recv_frame(reader)
+            frame = await recv(reader)
             if frame is None:
                 break
-            msg = json.loads(frame.decode("utf-8"))
+            msg = loads(frame)
             typ = msg.get("type")
-            data = msg.get("data", {}) or {}
-
-            if typ == "player_register":
-                await handle_player_register(writer, data)
-            elif typ == "player_login":
-                await handle_player_login(writer, data)
-            elif typ == "player_logout":
-                await handle_player_logout(writer)
-            elif typ == "player_list":
-                await handle_player_list(writer)
-
-            elif typ == "store_list_games":
-                await handle_store_list_games(writer)
-            elif typ == "store_game_detail":
-                await handle_store_game_detail(writer, data)
-            elif typ == "store_download_init":
-                await handle_store_download_init(writer, data)
-            elif typ == "store_download_chunk":
-                await handle_store_download_chunk(writer, data)
-
-            elif typ == "room_list":
-                await handle_room_list(writer)
-            elif typ == "room_detail":
-                await handle_room_detail(writer, data)
-            elif typ == "room_create":
-                await handle_room_create(writer, data)
-            elif typ == "room_join":
-                await handle_room_join(writer, data)
-            elif typ == "room_leave":
-                await handle_room_leave(writer)
-            elif typ == "room_start":
-                await handle_room_start(writer, data)
-
-            elif typ == "post_result":
-                await handle_post_result(writer, data)
-
-            elif typ == "review_create_or_update":
-                await handle_review_upsert(writer, data)
-            elif typ == "match_list_mine":
-                await handle_match_list_mine(writer)
-            else:
-                await _send(writer, _err("unknown_type"))
+            data = msg.get("data") or _EMPTY
+
+            # Per-chunk download requests dominate traffic; skip the table for them.
+            if typ == "store_download_chunk_bin":
+                await chunk_bin(writer, data)
+                continue
+            if typ == "store_download_chunk":
+                await chunk_b64(writer, data)
+                continue
+            fn = handlers.get(typ) if isinstance(typ, str) else None
+            if fn is None:
+                await _send_bytes(writer, _ERR_UNKNOWN_TYPE)
+                continue
+            await fn(writer, data)
 
     except FramingError:
         pass
     except Exception:
         with contextlib.suppress(Exception):
-            await _send(writer, _err("server_exception"))
+            await _send_bytes(writer, _ERR_SERVER_EXCEPTION)
     finally:
-        await _cleanup_connection(writer, notify_client=False)
+        # Room leave / match teardown can take several DB round trips; let them
+        # run in the background so the socket is closed right away.
+        task = asyncio.create_task(_cleanup_connection(writer, notify_client=False))
+        _PENDING_CLEANUPS.add(task)
+        task.add_done_callback(_PENDING_CLEANUPS.discard)
+        for d in [d for d in DOWNLOADS.values() if d.owner is writer]:
+            _end_download(d)
         writer.close()
         with contextlib.suppress(Exception):
             await writer.wait_closed()
 
 
 async def main():
-    server = await asyncio.start_server(handle, HOST, PORT)
-    async with server:
-        await server.serve_forever()
+    server = await asyncio.start_server(handle, HOST, PORT, backlog=LISTEN_BACKLOG, limit=READ_BUFFER_LIMIT)
+    await DB_POOL.warm()
+    reaper = asyncio.create_task(_download_reaper())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reaper.cancel()
+        if _PENDING_CLEANUPS:
+            await asyncio.gather(*_PENDING_CLEANUPS, return_exceptions=True)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_event_loop(main())